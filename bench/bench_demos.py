@@ -0,0 +1,185 @@
+# BENCH_DEMOS runs the playground demos headless on a Linux host (see hostshim.py) as
+# end-to-end scenario benchmarks. Each scenario drives a demo with a scripted button
+# timeline and a fixed random seed for a given number of frames. The timeline also names
+# segments of the run (e.g. a page of the Shapes demo or 42 balloons in inverted mode),
+# and the distribution of frame times is reported separately for each segment.
+#
+# python3 bench/bench_demos.py [--out results.json] [--scenario NAME] [--dt MS]
+#  - --out: write results as JSON (one record per scenario segment)
+#  - --scenario: only run scenarios whose name contains this substring
+#  - --dt: virtual frame time in ms for uncapped frame rate (default 1000/60)
+#
+# Game logic in the demos sees a virtual clock, which advances by 1000/fps ms on every
+# thumby.display.update() (fps as set with thumby.display.setFPS(), or --dt if uncapped).
+# This makes every run do exactly the same work. Frame times reported are real host times
+# between consecutive display updates, so only relative timings are meaningful.
+#
+# A timeline is a list of events (frame, action, arg) applied at the start of that frame:
+#  - ("press", "A"): button down for a single frame
+#  - ("hold", "U") / ("release", "U"): button down until released
+#  - ("label", "twister tightest"): start a new measurement segment
+
+import argparse
+import json
+import os
+import random
+import runpy
+import sys
+import time
+
+import hostshim
+hostshim.install()
+
+import thumby
+
+scenarios = [
+    {
+        "name": "balloons", "script": "playground/Balloons.py", "seed": 1, "frames": 1000,
+        "timeline": [(0, "label", "13 balloons")] +
+                    [(100 + 2 * i, "press", "U") for i in range(29)] +
+                    [(200, "label", "42 balloons"),
+                     (400, "press", "A"), (402, "label", "42 inverted"),
+                     (600, "hold", "L"), (602, "label", "42 inverted wind"),
+                     (800, "release", "L"), (800, "press", "A"),
+                     ] + [(802 + 2 * i, "press", "D") for i in range(36)] +
+                    [(880, "label", "6 balloons")],
+    },
+    {
+        "name": "shapes", "script": "playground/Shapes.py", "seed": 1, "frames": 2400,
+        "timeline": [(0, "label", "start page"),
+                     (60, "press", "A"), (62, "label", "rect fill"),
+                     (300, "press", "U"), (302, "label", "rect outline"),
+                     (540, "press", "D"), (542, "label", "ellipse outline"),
+                     (780, "press", "D"), (782, "label", "lozenge outline"),
+                     (1020, "press", "A"), (1022, "label", "twister"),
+                     (1200, "hold", "U"), (1260, "release", "U"), (1262, "label", "twister tightening"),
+                     (1500, "label", "twister tightest"),
+                     (1740, "press", "A"), (1742, "label", "parallax"),
+                     (2000, "press", "A"), (2002, "label", "polygons"),
+                     ],
+    },
+    {
+        "name": "textmode", "script": "playground/TextModeTest.py", "seed": 1, "frames": 1800,
+        "timeline": [(0, "label", "intro"),
+                     (40, "label", "lines block"),
+                     (200, "press", "U"), (202, "label", "lines outline"),
+                     (360, "press", "U"), (362, "label", "lines overlay"),
+                     (520, "press", "A"), (522, "label", "uncapped lines overlay"),
+                     (680, "press", "L"), (682, "label", "uncapped lines overlay shapes"),
+                     (840, "press", "A"), (842, "label", "scroll overlay"),
+                     (1100, "press", "U"), (1102, "press", "U"), (1104, "label", "scroll inverted"),
+                     (1400, "press", "D"), (1402, "label", "scroll inverted no bg"),
+                     ],
+    },
+]
+
+class _Done(Exception):
+    pass
+
+class Runner:
+    def __init__(self, scenario, dt_ms):
+        self.scenario = scenario
+        self.dt_ms = dt_ms
+        self.events = {}
+        for frame, action, arg in scenario["timeline"]:
+            self.events.setdefault(frame, []).append((action, arg))
+        self.frame = 0
+        self.clock_ms = 0.0
+        self.held = set()
+        self.label = "start"
+        self.segments = {} # label -> list of frame times (ms)
+        self.order = []
+        self.t_last = None
+
+    def clock(self):
+        return self.clock_ms
+
+    def apply_events(self):
+        pressed = set(self.held)
+        for action, arg in self.events.get(self.frame, []):
+            if action == "press":
+                pressed.add(arg)
+            elif action == "hold":
+                self.held.add(arg)
+                pressed.add(arg)
+            elif action == "release":
+                self.held.discard(arg)
+                pressed.discard(arg)
+            elif action == "label":
+                self.label = arg
+            else:
+                raise Exception(f"unknown timeline action {action}")
+        for name, button in thumby.buttons.items():
+            button.set(name in pressed)
+
+    def on_update(self):
+        t = time.perf_counter_ns()
+        if self.t_last is not None:
+            if self.label not in self.segments:
+                self.segments[self.label] = []
+                self.order.append(self.label)
+            self.segments[self.label].append((t - self.t_last) / 1e6)
+        fps = thumby.display.fps
+        self.clock_ms += 1000.0 / fps if fps > 0 else self.dt_ms
+        self.frame += 1
+        if self.frame >= self.scenario["frames"]:
+            raise _Done()
+        self.apply_events()
+        self.t_last = time.perf_counter_ns()
+
+    def run(self):
+        display = thumby.display
+        display.fill(0)
+        display.frames = 0
+        display.fps = 30
+        display.on_update = self.on_update
+        hostshim.use_clock(self.clock)
+        random.seed(self.scenario["seed"])
+        self.apply_events()
+        self.t_last = time.perf_counter_ns()
+        try:
+            runpy.run_path(os.path.join(hostshim.root, self.scenario["script"]), run_name="__main__")
+        except _Done:
+            pass
+        finally:
+            display.on_update = None
+            hostshim.use_clock(None)
+        return [stats(self.scenario["name"], label, self.segments[label]) for label in self.order]
+
+def percentile(srt, p):
+    k = int(p * len(srt) / 100.0 + 0.5) - 1
+    return srt[max(0, min(len(srt) - 1, k))]
+
+def stats(name, label, times):
+    srt = sorted(times)
+    return {
+        "scenario": name, "segment": label, "frames": len(times),
+        "mean_ms": round(sum(times) / len(times), 3),
+        "p50_ms": round(percentile(srt, 50), 3), "p95_ms": round(percentile(srt, 95), 3),
+        "p99_ms": round(percentile(srt, 99), 3), "max_ms": round(srt[-1], 3),
+    }
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="headless scenario benchmarks for the playground demos (host)")
+    ap.add_argument("--out", help="write results to JSON file")
+    ap.add_argument("--scenario", default="", help="only run scenarios matching substring")
+    ap.add_argument("--dt", type=float, default=1000.0 / 60, help="virtual frame time (ms) if frame rate is uncapped")
+    args = ap.parse_args(argv)
+
+    results = []
+    print(f"{'scenario':<10s} {'segment':<32s} {'frames':>6s} {'mean':>8s} {'p50':>8s} {'p95':>8s} {'p99':>8s} {'max':>8s}")
+    for scenario in scenarios:
+        if args.scenario not in scenario["name"]:
+            continue
+        for r in Runner(scenario, args.dt).run():
+            results.append(r)
+            print(f"{r['scenario']:<10s} {r['segment']:<32s} {r['frames']:6d} {r['mean_ms']:8.2f} "
+                  f"{r['p50_ms']:8.2f} {r['p95_ms']:8.2f} {r['p99_ms']:8.2f} {r['max_ms']:8.2f}")
+            sys.stdout.flush()
+
+    if args.out:
+        with open(args.out, "w") as fh:
+            json.dump({"dt_ms": args.dt, "results": results}, fh, indent=1)
+
+if __name__ == "__main__":
+    main()
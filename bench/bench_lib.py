@@ -0,0 +1,326 @@
+# BENCH_LIB runs microbenchmarks for the drawing primitives of all libs on a Linux host
+# (see hostshim.py for the stand-ins used). Every primitive is run over a sweep of sizes,
+# drawing modes and clipping cases. Results are printed as a table and can be written to a
+# JSON file, which makes it easy to compare timings before and after an optimisation.
+#
+# python3 bench/bench_lib.py [--out results.json] [--compare old.json] [--filter NAME] [--time SEC]
+#  - --out: write results as JSON (list of records with name, params, ns per call)
+#  - --compare: show speed ratio relative to an earlier result file
+#  - --filter: only run benchmarks whose name contains this substring
+#  - --time: minimal measuring time per case in seconds (default 0.05)
+#
+# Keep in mind that the host runs viper code as ordinary Python, so only relative timings
+# of the same case are meaningful. Each case is measured by calling it in a loop for at
+# least --time seconds; the best of three such runs is reported.
+
+import argparse
+import json
+import platform
+import sys
+import time
+from array import array
+
+import hostshim
+hostshim.install()
+
+import thumby
+import shapes
+import sprites
+import textmode
+
+cases = [] # list of (name, params, function)
+
+def add(name, f, **params):
+    cases.append((name, params, f))
+
+SHAPE_MODES = {
+    "fill": shapes.fill, "outline": shapes.outline, "bg_fill": shapes.bg_fill,
+    "bg_outline": shapes.bg_outline, "xor": shapes.xor,
+}
+SPRITE_MODES = {
+    "normal": sprites.normal, "invert": sprites.inverted, "xor": sprites.xor,
+    "silhouette": sprites.silhouette, "outline": sprites.outline, "transparent": sprites.transparent,
+}
+TEXT_MODES = {
+    "block": textmode.block, "outline": textmode.outline, "inverted": textmode.inverted,
+    "overlay": textmode.overlay, "overlay_outline": textmode.overlay_outline,
+}
+
+# --- shapes: vline, hline, rect ---
+for mname, mode in SHAPE_MODES.items():
+    for w in (1, 10, 72):
+        for h in (1, 8, 20, 40):
+            y1 = 0 if h == 40 else 3
+            add("vline", (lambda w=w, h=h, y1=y1, mode=mode: shapes.vline(10, 10 + w - 1, y1, y1 + h - 1, mode)),
+                mode=mname, width=w, height=h, clip="inside")
+    add("vline", (lambda mode=mode: shapes.vline(-5, 20, -10, 30, mode)), mode=mname, width=26, height=41, clip="partial")
+    add("vline", (lambda mode=mode: shapes.vline(80, 90, 0, 39, mode)), mode=mname, width=11, height=40, clip="outside")
+for mname in ("fill", "xor", "bg_fill"):
+    mode = SHAPE_MODES[mname]
+    for length in (1, 10, 72):
+        add("hline", (lambda l=length, mode=mode: shapes.hline(17, 0, l - 1, mode)), mode=mname, length=length, clip="inside")
+    add("hline", (lambda mode=mode: shapes.hline(17, -20, 100, mode)), mode=mname, length=121, clip="partial")
+    add("hline", (lambda mode=mode: shapes.hline(45, 0, 71, mode)), mode=mname, length=72, clip="outside")
+for mname, mode in SHAPE_MODES.items():
+    add("rect", (lambda mode=mode: shapes.rect(10, 5, 60, 35, mode)), mode=mname, size="51x31", clip="inside")
+
+# --- shapes: Shape.draw with precomputed boundary ---
+bench_shape = shapes.Shape()
+for x in range(72):
+    bench_shape.upper[x] = 5 + (x * 7) % 11
+    bench_shape.lower[x] = 25 + (x * 5) % 13
+for mname, mode in SHAPE_MODES.items():
+    for w in (8, 36, 72):
+        add("Shape.draw", (lambda w=w, mode=mode: bench_shape.draw(0, w - 1, mode)), mode=mname, width=w, clip="inside")
+    add("Shape.draw", (lambda mode=mode: bench_shape.draw(-10, 80, mode)), mode=mname, width=91, clip="partial")
+
+# --- shapes: ellipse, lozenge ---
+for mname, mode in SHAPE_MODES.items():
+    for r in (3.0, 10.0, 19.0):
+        add("ellipse", (lambda r=r, mode=mode: shapes.ellipse(36.0, 19.5, r, r, mode)), mode=mname, radius=r, clip="inside")
+        add("lozenge", (lambda r=r, mode=mode: shapes.lozenge(36.0, 19.5, r, r, mode)), mode=mname, radius=r, clip="inside")
+    add("ellipse", (lambda mode=mode: shapes.ellipse(5.0, 5.0, 25.0, 15.0, mode)), mode=mname, radius=25.0, clip="partial")
+    add("lozenge", (lambda mode=mode: shapes.lozenge(5.0, 5.0, 25.0, 15.0, mode)), mode=mname, radius=25.0, clip="partial")
+
+# --- shapes: twister ---
+for wl in (18.0, 40.0, 80.0):
+    add("twister", (lambda wl=wl: shapes.twister(1.0, wl, wl)), wavelen=wl, clip="inside")
+add("twister", (lambda: shapes.twister(1.0, 40.0, 18.0)), wavelen="40-18", clip="inside")
+
+# --- shapes: ConvexPoly ---
+def ngon(n, r):
+    import math
+    return shapes.ConvexPoly([r * math.cos(2 * math.pi * i / n) for i in range(n)],
+                             [r * math.sin(2 * math.pi * i / n) for i in range(n)])
+for n in (3, 8, 16):
+    poly = ngon(n, 15.0)
+    for mname in ("fill", "outline", "xor"):
+        mode = SHAPE_MODES[mname]
+        add("ConvexPoly.draw", (lambda p=poly, mode=mode: p.draw(36.0, 20.0, mode)), mode=mname, n=n, angle=0, clip="inside")
+        add("ConvexPoly.draw", (lambda p=poly, mode=mode: p.draw(36.0, 20.0, mode, angle=33.0, sx=1.5, sy=0.8)),
+            mode=mname, n=n, angle=33, clip="inside")
+        add("ConvexPoly.draw", (lambda p=poly, mode=mode: p.draw(0.0, 0.0, mode)), mode=mname, n=n, angle=0, clip="partial")
+
+# --- sprites: Sprite.draw ---
+balloon_fg = bytearray([0,240,152,12,228,246,254,254,254,252,252,248,224,0,0,3,15,31,63,127,255,191,223,103,59,12,7,0,0,0,0,0,0,12,147,97,0,0,0,0,0,0])
+balloon_mask = bytearray([240,248,252,254,254,255,255,255,255,254,254,252,248,224,3,15,31,63,127,255,255,255,255,255,127,63,15,7,0,0,0,0,12,31,191,115,1,0,0,0,0,0])
+sprite_set = {
+    "8x8": sprites.Sprite(8, 8, bytearray([0x3c, 0x42, 0x81, 0x81, 0x81, 0x81, 0x42, 0x3c]), bytearray([0xff] * 8)),
+    "14x24": sprites.Sprite(14, 24, balloon_fg, balloon_mask),
+    "32x16": sprites.Sprite(32, 16, bytearray(range(64)), bytearray([0xff] * 64)),
+}
+for sname, spr in sprite_set.items():
+    for mname, mode in SPRITE_MODES.items():
+        add("Sprite.draw", (lambda s=spr, m=mode: s.draw(20, 8, m)), sprite=sname, mode=mname, shift=0, clip="inside")
+        add("Sprite.draw", (lambda s=spr, m=mode: s.draw(20, 11, m)), sprite=sname, mode=mname, shift=3, clip="inside")
+        add("Sprite.draw", (lambda s=spr, m=mode: s.draw(-5, -5, m)), sprite=sname, mode=mname, shift=3, clip="partial")
+        add("Sprite.draw", (lambda s=spr, m=mode: s.draw(-50, 50, m)), sprite=sname, mode=mname, shift=0, clip="outside")
+
+for fname, flip in (("h", sprites.flip_h), ("v", sprites.flip_v), ("hv", sprites.flip_h | sprites.flip_v)):
+    spr = sprite_set["14x24"]
+    add("Sprite.draw", (lambda s=spr, f=flip: s.draw(20, 11, f)), sprite="14x24", mode="normal", shift=3, clip="inside", flip=fname)
+atlas = sprite_set["32x16"]
+for vname, view in (("8x8", atlas.view(8, 0, 8, 8)), ("8x8+3", atlas.view(8, 3, 8, 8))):
+    add("Sprite.draw", (lambda s=view: s.draw(20, 11, sprites.normal)), sprite=vname, mode="normal", shift=3, clip="inside", view="32x16")
+# room for all pre-shifted cases below (a failed .preshift() would silently measure the column words)
+sprites.preshift_limit = 16384
+tall_sprites = {
+    "columns": sprites.Sprite(24, 40, bytearray(range(120)), bytearray([0xff] * 120)),
+    "preshift": sprites.Sprite(24, 40, bytearray(range(120)), bytearray([0xff] * 120)),
+}
+if not tall_sprites["preshift"].preshift():
+    raise Exception("preshift_limit too small for benchmark")
+for cname, spr in tall_sprites.items():
+    for mname in ("normal", "outline"):
+        add("Sprite.draw", (lambda s=spr, m=SPRITE_MODES[mname]: s.draw(20, 0, m)), sprite="24x40", mode=mname, shift=0, clip="inside", cache=cname)
+        add("Sprite.draw", (lambda s=spr, m=SPRITE_MODES[mname]: s.draw(20, -3, m)), sprite="24x40", mode=mname, shift=5, clip="partial", cache=cname)
+
+for sname, base in sprite_set.items():
+    spr = sprites.Sprite(base.width, base.height, base.bitmap, base.mask, True)
+    if not spr.preshift():
+        raise Exception("preshift_limit too small for benchmark")
+    for mname, mode in SPRITE_MODES.items():
+        if mode == sprites.outline:
+            continue # needs neighbour columns, always drawn from column words
+        add("Sprite.draw", (lambda s=spr, m=mode: s.draw(20, 11, m)), sprite=sname, mode=mname, shift=3, clip="inside", cache="preshift")
+        add("Sprite.draw", (lambda s=spr, m=mode: s.draw(-5, -5, m)), sprite=sname, mode=mname, shift=3, clip="partial", cache="preshift")
+
+balloon_words = sprite_set["14x24"]
+add("Sprite.__init__", (lambda: sprites.Sprite(14, 24, balloon_fg, balloon_mask)), sprite="14x24", packed=False)
+add("Sprite.__init__", (lambda: sprites.Sprite(14, 24, balloon_words.bitmap, balloon_words.mask, True)), sprite="14x24", packed=True)
+add("sprites.load", (lambda: sprites.load("balloon.tba")), sprite="14x24", packed=True)
+
+# --- sprites: Variants ---
+variants = sprites.Variants(sprite_set["14x24"], 16, limit=4)
+add("Variants.get", (lambda v=variants: v.get(30.0)), angles=16, cached=True)
+add("Variants.get", (lambda v=variants: [v.get(a * 22.5) for a in range(5)]), angles=16, cached=False, calls=5, limit=4)
+add("Variants.draw", (lambda v=variants: v.draw(36, 20, 30.0)), angles=16, size=variants.size, clip="inside")
+
+# --- sprites: SpriteObj ---
+def make_obj(clip):
+    obj = sprites.SpriteObj([sprite_set["14x24"]] * 4, 10.0, 10.0, 5.0, -3.0)
+    if clip is not None:
+        obj.play(clip)
+    return obj
+for cname, clip in (("none", None), ("loop", sprites.Clip(0, 3, 50)), ("pingpong", sprites.Clip(0, 3, 50, sprites.anim_pingpong))):
+    add("SpriteObj.update", (lambda o=make_obj(clip): o.update(0.02)), clip=cname)
+
+# --- sprites: SpriteGroup ---
+def make_group(n):
+    grp = sprites.SpriteGroup([sprite_set["14x24"]], n)
+    for i in range(n):
+        grp.spawn((i * 7) % 64 - 8.0, 10.0 + i % 30, (i % 31) - 15.0, -10.0 - i % 30, 0.0, -5.0, 0.5, 0.0)
+    return grp
+for n in (42, 300):
+    add("SpriteGroup.update", (lambda g=make_group(n): g.update(0.02)), n=n)
+add("SpriteGroup.draw", (lambda g=make_group(42): g.draw()), n=42, clip="partial")
+def respawn(grp, n):
+    for k in range(n):
+        grp.despawn(grp.live[0])
+        grp.spawn(10.0, 10.0)
+add("SpriteGroup.despawn+spawn", (lambda g=make_group(300): respawn(g, 10)), n=300, recycled=10)
+
+# --- sprites: collision ---
+balloon = sprite_set["14x24"]
+add("sprites.collide", (lambda: sprites.collide(balloon, 10, 5, balloon, 40, 5)), overlap="none")
+add("sprites.collide", (lambda: sprites.collide(balloon, 10, 5, balloon, 22, 14)), overlap="box", hit=False)
+add("sprites.collide", (lambda: sprites.collide(balloon, 10, 5, balloon, 14, 9)), overlap="box", hit=True)
+add("sprites.touches", (lambda: sprites.touches(balloon, 20, 9)), clip="inside")
+tall = tall_sprites["columns"]
+add("sprites.collide", (lambda: sprites.collide(tall, 10, 0, balloon, 14, 9)), overlap="box", hit=True, sprite="24x40")
+add("sprites.touches", (lambda: sprites.touches(tall, 20, 0)), clip="inside", sprite="24x40")
+
+# --- sprites: SpatialGrid ---
+small = sprites.Sprite(3, 3, bytearray(3), bytearray(3))
+def make_grid_group(n):
+    grp = sprites.SpriteGroup([small], n)
+    for i in range(n):
+        grp.spawn((i * 37) % 88 - 8.0, (i * 23) % 56 - 8.0)
+    return grp
+for n in (42, 300):
+    grp = make_grid_group(n)
+    grid = sprites.SpatialGrid(n)
+    grid.build(grp)
+    pair_a = array("H", [0] * (4 * n))
+    pair_b = array("H", [0] * (4 * n))
+    found = array("H", [0] * n)
+    add("SpatialGrid.build", (lambda g=grid, grp=grp: g.build(grp)), n=n)
+    add("SpatialGrid.query", (lambda g=grid, f=found: g.query(30, 15, 12, 12, f)), n=n, rect="12x12")
+    add("SpatialGrid.pairs", (lambda g=grid, a=pair_a, b=pair_b: g.pairs(a, b)), n=n)
+
+# --- textmode ---
+short_text = "SCORE 42"
+long_text = "THIS IS A\nSAMPLE OF\nTEXT WE CAN\nDISPLAY!\n  SCORE:42"
+scroll_line = "&&& See how nicely 'textmode' renders [ scrolling [ text [ rows [ !!!"
+for mname, mode in TEXT_MODES.items():
+    add("print_text", (lambda mode=mode: textmode.print_text(1, 2, short_text, mode)), mode=mname, chars=len(short_text), clip="inside")
+    add("print_text", (lambda mode=mode: textmode.print_text(0, 0, long_text, mode)), mode=mname, chars=len(long_text), clip="partial")
+    add("scroll_text", (lambda mode=mode: textmode.scroll_text(3, 2, short_text, mode)), mode=mname, chars=len(short_text), offset=3, clip="inside")
+    add("scroll_text", (lambda mode=mode: textmode.scroll_text(-200, 2, scroll_line, mode)), mode=mname, chars=len(scroll_line), offset=-200, clip="partial")
+    add("scroll_text", (lambda mode=mode: textmode.scroll_text(-490, 2, scroll_line, mode)), mode=mname, chars=len(scroll_line), offset=-490, clip="outside")
+
+short_label = textmode.Label(short_text)
+long_label = textmode.Label(long_text)
+scroll_label = textmode.Label(scroll_line)
+for mname, mode in TEXT_MODES.items():
+    add("print_label", (lambda mode=mode: textmode.print_label(1, 2, short_label, mode)), mode=mname, chars=len(short_text), clip="inside")
+    add("print_label", (lambda mode=mode: textmode.print_label(0, 0, long_label, mode)), mode=mname, chars=len(long_text), clip="partial")
+    add("scroll_label", (lambda mode=mode: textmode.scroll_label(3, 2, short_label, mode)), mode=mname, chars=len(short_text), offset=3, clip="inside")
+    add("scroll_label", (lambda mode=mode: textmode.scroll_label(-200, 2, scroll_label, mode)), mode=mname, chars=len(scroll_line), offset=-200, clip="partial")
+    add("scroll_label", (lambda mode=mode: textmode.scroll_label(-490, 2, scroll_label, mode)), mode=mname, chars=len(scroll_line), offset=-490, clip="outside")
+for mname, mode in TEXT_MODES.items():
+    for y in (16, 19):
+        add("draw_text", (lambda y=y, mode=mode: textmode.draw_text(8, y, short_text, mode)), mode=mname, chars=len(short_text), shift=y % 8, clip="inside")
+    add("draw_text", (lambda mode=mode: textmode.draw_text(-3, -5, long_text, mode)), mode=mname, chars=len(long_text), shift=3, clip="partial")
+    add("draw_label", (lambda mode=mode: textmode.draw_label(8, 19, short_label, mode)), mode=mname, chars=len(short_text), shift=3, clip="inside")
+
+bench_marquee = textmode.Marquee(scroll_line)
+bench_marquee.move_to(-200)
+for mname, mode in TEXT_MODES.items():
+    add("Marquee.draw", (lambda mode=mode: bench_marquee.draw(2, mode)), mode=mname, chars=len(scroll_line), offset=-200, clip="partial")
+
+def with_font(font, f):
+    def run():
+        textmode.set_font(font)
+        f()
+        textmode.set_font(textmode.font7x8)
+    return run
+for mname, mode in TEXT_MODES.items():
+    add("print_text", with_font(textmode.font3x5, lambda mode=mode: textmode.print_text(0, 0, long_text, mode)), mode=mname, chars=len(long_text), clip="partial", font="3x5")
+    add("scroll_text", with_font(textmode.font3x5, lambda mode=mode: textmode.scroll_text(-200, 2, scroll_line, mode)), mode=mname, chars=len(scroll_line), offset=-200, clip="partial", font="3x5")
+
+for mname in ("block", "overlay"):
+    mode = TEXT_MODES[mname]
+    add("print_int", (lambda mode=mode: textmode.print_int(3, 4, 42, 5, mode)), mode=mname, width=5, digits=2, clip="inside")
+    add("print_int", (lambda mode=mode: textmode.print_int(0, 4, -1234567, 10, mode, zero=True)), mode=mname, width=10, digits=7, clip="inside")
+    add("print_fixed", (lambda mode=mode: textmode.print_fixed(3, 4, 605, 1, 5, mode)), mode=mname, width=5, digits=3, clip="inside")
+    add("print_text", (lambda mode=mode: textmode.print_text(3, 4, f"{60.5:5.1f}", mode)), mode=mname, width=5, digits=3, clip="inside", via="fstring")
+
+bench_console = textmode.Console()
+for l, line in enumerate(long_text.split("\n")):
+    bench_console.print_text(0, l, line, textmode.block)
+def console_redraw(n_changed):
+    for i in range(n_changed):
+        bench_console.shown_modes[i] = 0xff
+    bench_console.draw()
+for n_changed in (0, 1, 50):
+    add("Console.draw", (lambda n=n_changed: console_redraw(n)), changed=n_changed, clip="inside")
+add("Console.scroll_up", (lambda: (bench_console.scroll_up(), bench_console.draw())), rows=5, clip="inside")
+
+
+def measure(f, min_time):
+    n = 1
+    while True: # find number of calls taking at least min_time seconds
+        t0 = time.perf_counter_ns()
+        for _ in range(n):
+            f()
+        dt = time.perf_counter_ns() - t0
+        if dt >= min_time * 1e9:
+            break
+        n *= 2
+    best = dt
+    for _ in range(2):
+        t0 = time.perf_counter_ns()
+        for _ in range(n):
+            f()
+        best = min(best, time.perf_counter_ns() - t0)
+    return best / n, n
+
+def key(name, params):
+    return name + " " + " ".join(f"{k}={v}" for k, v in params.items())
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="microbenchmarks for Thumby drawing libs (host)")
+    ap.add_argument("--out", help="write results to JSON file")
+    ap.add_argument("--compare", help="compare against earlier JSON results")
+    ap.add_argument("--filter", default="", help="only run benchmarks matching substring")
+    ap.add_argument("--time", type=float, default=0.05, help="minimal measuring time per case (s)")
+    args = ap.parse_args(argv)
+
+    old = {}
+    if args.compare:
+        with open(args.compare) as fh:
+            old = {key(r["name"], r["params"]): r["ns_per_call"] for r in json.load(fh)["results"]}
+
+    results = []
+    for name, params, f in cases:
+        if args.filter not in name:
+            continue
+        thumby.display.fill(0)
+        ns, n = measure(f, args.time)
+        results.append({"name": name, "params": params, "ns_per_call": round(ns, 1), "calls": n})
+        k = key(name, params)
+        line = f"{k:<72s} {ns / 1000:10.2f} us"
+        if k in old:
+            line += f"  x{old[k] / ns:5.2f}"
+        print(line)
+        sys.stdout.flush()
+
+    if args.out:
+        meta = {"python": platform.python_version(), "implementation": platform.python_implementation(),
+                "machine": platform.machine(), "time": time.strftime("%Y-%m-%d %H:%M:%S")}
+        with open(args.out, "w") as fh:
+            json.dump({"meta": meta, "results": results}, fh, indent=1)
+
+if __name__ == "__main__":
+    main()
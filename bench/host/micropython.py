@@ -0,0 +1,11 @@
+# Host stand-in for the MicroPython `micropython` module: code emitter decorators
+# are no-ops, so viper and native functions run as ordinary Python code.
+
+def viper(f):
+    return f
+
+def native(f):
+    return f
+
+def const(x):
+    return x
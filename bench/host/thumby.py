@@ -0,0 +1,86 @@
+# Host stand-in for the parts of the Thumby API used by the libs and playground demos.
+# The display buffer has the same layout as on the device (5 rows of 72 bytes, LSB at top),
+# so the libs render exactly the same pixels. Drawing methods are simple and slow; they only
+# need to be correct. Buttons are plain state objects that a test driver can set directly.
+# display.on_update can be set to a function that is called on every display.update().
+
+class _Display:
+    def __init__(self):
+        self.buffer = bytearray(72 * 40 // 8)
+
+class Display:
+    width = 72
+    height = 40
+
+    def __init__(self):
+        self.display = _Display()
+        self.fps = 30
+        self.frames = 0
+        self.on_update = None
+
+    def setFPS(self, fps):
+        self.fps = fps
+
+    def update(self):
+        self.frames += 1
+        if self.on_update is not None:
+            self.on_update()
+
+    def fill(self, color):
+        buf = self.display.buffer
+        buf[:] = (b"\xff" if color else b"\x00") * len(buf)
+
+    def setPixel(self, x, y, color):
+        if 0 <= x < 72 and 0 <= y < 40:
+            buf = self.display.buffer
+            if color:
+                buf[(y >> 3) * 72 + x] |= 1 << (y & 7)
+            else:
+                buf[(y >> 3) * 72 + x] &= 0xff ^ (1 << (y & 7))
+
+    def getPixel(self, x, y):
+        if 0 <= x < 72 and 0 <= y < 40:
+            return (self.display.buffer[(y >> 3) * 72 + x] >> (y & 7)) & 1
+        return 0
+
+    def drawFilledRectangle(self, x, y, w, h, color):
+        for yy in range(y, y + h):
+            for xx in range(x, x + w):
+                self.setPixel(xx, yy, color)
+
+    def drawRectangle(self, x, y, w, h, color):
+        for xx in range(x, x + w):
+            self.setPixel(xx, y, color)
+            self.setPixel(xx, y + h - 1, color)
+        for yy in range(y, y + h):
+            self.setPixel(x, yy, color)
+            self.setPixel(x + w - 1, yy, color)
+
+    def drawText(self, text, x, y, color):
+        pass # not rendered on the host
+
+
+class Button:
+    def __init__(self):
+        self.down = False
+        self.prev = False
+
+    def pressed(self):
+        return self.down
+
+    def justPressed(self):
+        return self.down and not self.prev
+
+    def set(self, down):
+        self.prev = self.down
+        self.down = down
+
+
+display = Display()
+buttonA = Button()
+buttonB = Button()
+buttonU = Button()
+buttonD = Button()
+buttonL = Button()
+buttonR = Button()
+buttons = {"A": buttonA, "B": buttonB, "U": buttonU, "D": buttonD, "L": buttonL, "R": buttonR}
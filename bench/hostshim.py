@@ -0,0 +1,100 @@
+# HOSTSHIM makes the libs importable with CPython on a Linux host, so they can be
+# benchmarked and checked without a Thumby. It installs
+#  - lib/ and assets/ on sys.path, so libs and asset files are found
+#  - stand-ins for the `thumby` and `micropython` modules (from bench/host/)
+#  - the viper builtins const(), uint(), ptr8(), ptr16(), ptr32()
+#  - time.ticks_ms(), time.ticks_us(), time.ticks_diff() and time.ticks_add()
+#
+# The viper pointer types are emulated by wrappers that truncate stored values to the
+# width of the pointer, as viper does. Absolute timings on the host are meaningless for
+# the device, but relative timings of two versions of the same code are a useful guide.
+#
+# import hostshim
+# hostshim.install()       # call before importing any lib module
+# hostshim.use_clock(f)    # use f() -> milliseconds as time source (default: real time)
+
+import builtins
+import os
+import sys
+import time
+from array import array
+
+here = os.path.dirname(os.path.abspath(__file__))
+root = os.path.dirname(here)
+
+class _Ptr:
+    __slots__ = ("buf", "mask", "signed")
+
+    def __init__(self, buf, bits):
+        self.buf = buf
+        self.mask = (1 << bits) - 1
+        self.signed = isinstance(buf, array) and buf.typecode in "bhilq"
+
+    def __getitem__(self, i):
+        return self.buf[i]
+
+    def __setitem__(self, i, v):
+        v &= self.mask
+        if self.signed and v > (self.mask >> 1):
+            v -= self.mask + 1
+        self.buf[i] = v
+
+def ptr8(buf):
+    return _Ptr(buf, 8)
+
+def ptr16(buf):
+    return _Ptr(buf, 16)
+
+def ptr32(buf):
+    return _Ptr(buf, 32)
+
+def uint(x):
+    return int(x) & 0xffffffff
+
+_TICKS_PERIOD = 1 << 30
+_clock = None
+_t0 = time.perf_counter_ns()
+
+def _real_ms():
+    return (time.perf_counter_ns() - _t0) // 1000000
+
+def ticks_ms():
+    return int(_clock() if _clock else _real_ms()) % _TICKS_PERIOD
+
+def ticks_us():
+    if _clock:
+        return int(_clock() * 1000) % _TICKS_PERIOD
+    return ((time.perf_counter_ns() - _t0) // 1000) % _TICKS_PERIOD
+
+def ticks_diff(t1, t0):
+    d = (t1 - t0) % _TICKS_PERIOD
+    return d - _TICKS_PERIOD if d >= _TICKS_PERIOD // 2 else d
+
+def ticks_add(t, delta):
+    return (t + delta) % _TICKS_PERIOD
+
+def use_clock(f):
+    global _clock
+    _clock = f
+
+installed = False
+
+def install():
+    global installed
+    if installed:
+        return
+    for path in (os.path.join(root, "assets"), os.path.join(root, "lib"), os.path.join(here, "host")):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    import micropython
+    builtins.micropython = micropython
+    builtins.const = micropython.const
+    builtins.uint = uint
+    builtins.ptr8 = ptr8
+    builtins.ptr16 = ptr16
+    builtins.ptr32 = ptr32
+    time.ticks_ms = ticks_ms
+    time.ticks_us = ticks_us
+    time.ticks_diff = ticks_diff
+    time.ticks_add = ticks_add
+    installed = True
@@ -0,0 +1,101 @@
+# ASSETS loads fonts and sprite bitmaps from compact binary asset files (.tba), which are
+# generated from the images in assets/ by the host-side converter tools/mkasset.py. Bitmap
+# data embedded as bytearray([...]) literals have to be compiled on the device and take up
+# heap space twice while the module is imported; binary files are instead read directly into
+# preallocated buffers with readinto().
+#
+# File format (all numbers little-endian):
+#   bytes 0-1   magic "TB"
+#   byte  2     kind of asset: "F" = font, "S" = sprite frames, "P" = packed sprite frames
+#   byte  3     format version (currently 1)
+#   byte  4     width of a single glyph / frame in px
+#   byte  5     height of a single glyph / frame in px
+#   bytes 6-7   count = number of glyphs / frames
+#   followed by the bitmap plane and the mask plane (fg and bg plane for fonts) with
+#   count * width * ((height + 7) // 8) bytes each; every glyph / frame is stored in the
+#   display layout, i.e. one row of width bytes for each 8 pixels of height (LSB at top)
+#   packed sprite frames instead store count * width 32-bit words per plane, one for each
+#   column (LSB at top), which is the layout used by the sprites lib when drawing; frames
+#   taller than 32 px have a second word per column: all low words (rows 0 .. 31) of a frame
+#   are followed by its high words (rows 32 .. 39)
+#
+# path = assets.find(name)
+#  - find asset file in the current directory or any directory on sys.path (e.g. /lib)
+#  - raises an exception if the file cannot be found
+#
+# kind, width, height, count = assets.info(path)
+#  - read header of asset file (kind is a single-character string)
+#
+# bitmap, mask = assets.load(path, kind, bitmap=None, mask=None)
+#  - read bitmap and mask planes of an asset file, checking that it is of the expected kind
+#  - if bitmap and mask are given, data are read into these buffers (which must have the
+#    right size), otherwise new buffers are allocated
+#  - planes are bytearrays, or arrays of 32-bit words for packed sprites (kind assets.PACKED)
+#
+# n = assets.plane_size(width, height, count, kind=assets.SPRITE)
+#  - number of elements (bytes or words) of each plane
+#
+# data = assets.header(kind, width, height, count)
+#  - header of an asset file as bytes (for writing asset files)
+
+import sys
+from array import array
+
+FONT = "F"
+SPRITE = "S"
+PACKED = "P"
+
+_header = bytearray(8)
+
+def find(name: str) -> str:
+    if name.startswith("/"):
+        return name
+    for d in [""] + sys.path:
+        path = d + "/" + name if d else name
+        try:
+            open(path, "rb").close()
+            return path
+        except OSError:
+            pass
+    raise Exception(f"asset file {name} not found")
+
+def _read_header(fh, path: str) -> (str, int, int, int):
+    if fh.readinto(_header) != 8 or _header[0] != 84 or _header[1] != 66: # "TB"
+        raise Exception(f"{path} is not an asset file")
+    if _header[3] != 1:
+        raise Exception(f"{path}: unsupported format version {_header[3]}")
+    return chr(_header[2]), _header[4], _header[5], _header[6] + (_header[7] << 8)
+
+def info(path: str) -> (str, int, int, int):
+    with open(path, "rb") as fh:
+        return _read_header(fh, path)
+
+def plane_size(width: int, height: int, count: int, kind: str = SPRITE) -> int:
+    if kind == PACKED:
+        return count * width * (2 if height > 32 else 1)
+    return count * width * ((height + 7) // 8)
+
+def _plane(size: int, kind: str):
+    if kind == PACKED:
+        return array("I", [0] * size) # "I" has 32 bits on the device and on the host
+    return bytearray(size)
+
+def header(kind: str, width: int, height: int, count: int) -> bytes:
+    return bytes([84, 66, ord(kind), 1, width, height, count & 0xff, count >> 8])
+
+def load(path: str, kind: str, bitmap: bytearray = None, mask: bytearray = None) -> (bytearray, bytearray):
+    with open(path, "rb") as fh:
+        k, width, height, count = _read_header(fh, path)
+        if k != kind:
+            raise Exception(f"{path}: expected asset of kind {kind}, found {k}")
+        size = plane_size(width, height, count, kind)
+        if bitmap is None:
+            bitmap = _plane(size, kind)
+        if mask is None:
+            mask = _plane(size, kind)
+        if len(bitmap) != size or len(mask) != size:
+            raise Exception(f"{path}: buffers must have {size} elements")
+        n_bytes = size * 4 if kind == PACKED else size
+        if fh.readinto(bitmap) != n_bytes or fh.readinto(mask) != n_bytes:
+            raise Exception(f"{path}: file is truncated")
+    return bitmap, mask
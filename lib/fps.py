@@ -14,12 +14,86 @@
 # t = fps_ctr.frame_time() # time since start of current frame (also as .frame_time_ms())
 # fps_ctr.tock()           # reset user timer
 # t = fps_ctr.tock_time()  # time since last .tock() (also as .tock_time_ms())
+#
+# FPS can also act as a simple frame profiler, measuring how much time is spent in named
+# sections of the frame loop (e.g. update, draw and display). Section timings are measured in
+# microseconds and averaged over the last N frames with the same approximation as fps().
+# Timing data are kept in preallocated integer arrays, so the profiler does not allocate memory
+# in the frame loop (except when a new section name is registered on its first use).
+# Section times measured between two calls of .tick() count towards the frame ended by the
+# second call, so .tick() may be called at the start or at the end of the frame loop.
+#
+# fps_ctr = FPS(N, sections=8)      # reserve space for up to 8 named sections
+# fps_ctr.begin("draw")             # start timing of section "draw"
+# fps_ctr.end("draw")               # stop timing (may be repeated several times per frame)
+# t = fps_ctr.section_ms("draw")    # average time per frame spent in section (floating-point)
+# t = fps_ctr.section_max_ms("draw")  # maximum time of a single begin/end pair in last N .. 2N frames
+# print(fps_ctr.summary())          # compact summary of all sections (one line per section)
+#
+# Since the running average hides occasional long frames (which players notice as stutter),
+# FPS also records the durations of the most recent frames in a small ring buffer. Recording
+# is cheap enough to leave on in a finished game; statistics are only computed on request.
+#
+# fps_ctr = FPS(N, history=64, stutter_ms=50)  # ring buffer size, stutter threshold
+# t = fps_ctr.last_frame_ms()       # duration of the last completed frame (integer ms)
+# t = fps_ctr.percentile_ms(95)     # 95th percentile of frame times in ring buffer (integer ms)
+# p50, p95, p99 = fps_ctr.percentiles()
+# t = fps_ctr.jitter_ms()           # mean absolute change between consecutive frame times (float)
+# t = fps_ctr.worst_ms()            # longest frame since creation or last .reset_stats()
+# n = fps_ctr.stutters()            # number of frames longer than stutter_ms since last reset
+# fps_ctr.reset_stats()             # reset worst frame, stutter count and ring buffer
+#
+# FixedStep drives a game loop with a fixed simulation rate (e.g. cheap 30 Hz physics) while
+# rendering runs as fast as possible. Elapsed frame time is collected in an integer accumulator
+# (microseconds) and converted into the number of simulation steps due in the current frame.
+# If the game falls behind, catch-up is capped at max_steps per frame and excess time is dropped.
+# The remainder of the accumulator gives an interpolation factor for drawing between the last two
+# simulation states.
+#
+# from fps import FPS, FixedStep
+# loop = FixedStep(fps_ctr, hz=30, max_steps=4)
+# fps_ctr.tick()                    # once per frame, as usual
+# for _ in range(loop.steps()):     # number of simulation steps in this frame (call once per frame)
+#     obj.update(loop.dt)           # loop.dt = fixed step in seconds (loop.dt_ms in integer ms)
+# alpha = loop.alpha()              # 0.0 <= alpha < 1.0: fraction of next step already elapsed
+# x = loop.lerp(x_prev, x, alpha)   # interpolate position between previous and current step
+# n = loop.dropped()                # number of steps dropped by catch-up cap so far
+#
+# Governor adjusts a quality level (0 = lowest) so that the game holds a target frame rate.
+# It averages frame times over a window of frames and lowers the level if the frame rate
+# drops more than slack percent below the target, or raises it if there is more than slack
+# percent headroom. After every change, decisions are suspended for hold frames. Whenever a
+# level had to be abandoned, the waiting time before retrying it is doubled (up to 8 x hold),
+# so the governor does not oscillate between two levels.
+#
+# from fps import FPS, Governor
+# gov = Governor(fps_ctr, target_fps=30, levels=5, level=4, window=20, slack=15, hold=60)
+# k = gov.register([6, 12, 20, 30, 42])     # one value per quality level, e.g. number of sprites
+# k_bg = gov.register([False, False, True, True, True])  # e.g. background layers on/off
+# if gov.update(): ...              # once per frame after .tick(), returns True if level changed
+# n = gov.value(k)                  # current value of a registered setting
+# gov.level                         # current quality level (read-only)
 
 
 import time
+from array import array
+
+@micropython.viper
+def _sort16(data, n: int):
+    # in-place insertion sort of first n elements of array("H"), fast enough for short buffers
+    buf = ptr16(data)
+    for i in range(1, n):
+        v = buf[i]
+        j = i - 1
+        while j >= 0 and buf[j] > v:
+            buf[j + 1] = buf[j]
+            j -= 1
+        buf[j + 1] = v
 
 class FPS:
-    def __init__(self, N=20):
+    def __init__(self, N=20, sections=8, history=64, stutter_ms=50):
+        if history < 1:
+            raise Exception("history must be >= 1")
         self.N = N
         self.prior_ms_per_frame = 100.0
         self.ms_per_frame_accum = 0
@@ -28,6 +102,24 @@ class FPS:
         self.t0 = time.ticks_ms()
         self.t_frame = self.t0
         self.t_tock = self.t0
+        # profiler sections: name -> index into preallocated timing arrays (all in microseconds)
+        self.n_sect = 0
+        self.sect_n = 0 # frames accumulated in current block of section timings
+        self.max_sect = sections
+        self.sect_idx = {}
+        self.sect_names = [None] * sections
+        self.sect_t0 = array("l", [0] * sections)        # start time of current begin/end pair
+        self.sect_frame = array("l", [0] * sections)     # accumulated time since last tick
+        self.sect_accum = array("l", [0] * sections)     # accumulated time in current block of N frames
+        self.sect_prior = array("l", [0] * sections)     # average time per frame in previous block
+        self.sect_max = array("l", [0] * sections)       # maximum time in current block
+        self.sect_prior_max = array("l", [0] * sections) # maximum time in previous block
+        # ring buffer of recent frame times (in ms) and jitter statistics
+        self.hist = array("H", [0] * history)
+        self.hist_sorted = array("H", [0] * history) # scratch buffer for percentiles
+        self.stutter_ms = stutter_ms
+        self.last_ms = 0
+        self.reset_stats()
 
     # call fps.tick() once per frame to record number of ms since last frame
     def tick(self):
@@ -39,8 +131,103 @@ class FPS:
             self.idx = 0
         self.ms_per_frame_accum += dt
         self.idx += 1
+        if self.n_sect:
+            self._tick_sections()
         self.ticks += 1
         self.t_frame = t1
+        # record frame time in ring buffer (clamped to 16 bits)
+        self.last_ms = dt
+        pos = self.hist_pos
+        self.hist[pos] = dt if dt < 0xffff else 0xffff
+        pos += 1
+        self.hist_pos = pos if pos < len(self.hist) else 0
+        if self.hist_n < pos:
+            self.hist_n = pos
+        self.is_sorted = False
+        if dt > self.worst:
+            self.worst = dt
+        if dt > self.stutter_ms:
+            self.n_stutter += 1
+
+    # add section times since last tick to the frame just ended, fold block after N frames
+    @micropython.native
+    def _tick_sections(self):
+        frame = self.sect_frame
+        accum = self.sect_accum
+        n = self.n_sect
+        for i in range(n):
+            accum[i] += frame[i]
+            frame[i] = 0
+        self.sect_n += 1
+        N = self.N
+        if self.sect_n < N:
+            return
+        prior = self.sect_prior
+        mx = self.sect_max
+        prior_mx = self.sect_prior_max
+        for i in range(n):
+            prior[i] = accum[i] // N
+            accum[i] = 0
+            prior_mx[i] = mx[i]
+            mx[i] = 0
+        self.sect_n = 0
+
+    # frame time statistics
+    def last_frame_ms(self) -> int:
+        return self.last_ms
+
+    def worst_ms(self) -> int:
+        return self.worst
+
+    def stutters(self) -> int:
+        return self.n_stutter
+
+    def reset_stats(self):
+        self.worst = 0
+        self.n_stutter = 0
+        self.hist_pos = 0
+        self.hist_n = 0
+        self.is_sorted = False
+
+    # p-th percentile (0 .. 100) of frame times in ring buffer (nearest rank, i.e. smallest frame
+    # time with at least p percent of frames at or below it; 0 if buffer is empty)
+    def percentile_ms(self, p) -> int:
+        n = self.hist_n
+        if n == 0:
+            return 0
+        srt = self.hist_sorted
+        if not self.is_sorted:
+            hist = self.hist
+            for i in range(n):
+                srt[i] = hist[i]
+            _sort16(srt, n)
+            self.is_sorted = True
+        k = int(-(-p * n // 100)) - 1 # rank rounded up, so that p = 99 of 64 frames is the worst
+        return srt[0 if k < 0 else n - 1 if k >= n else k]
+
+    def percentiles(self) -> (int, int, int):
+        return self.percentile_ms(50), self.percentile_ms(95), self.percentile_ms(99)
+
+    # mean absolute difference between consecutive frame times in ring buffer
+    def jitter_ms(self) -> float:
+        n = self.hist_n
+        if n < 2:
+            return 0.0
+        hist = self.hist
+        L = len(hist)
+        i = self.hist_pos - n # walk from oldest to newest entry
+        if i < 0:
+            i += L
+        prev = hist[i]
+        total = 0
+        for _ in range(n - 1):
+            i += 1
+            if i >= L:
+                i = 0
+            cur = hist[i]
+            total += cur - prev if cur > prev else prev - cur
+            prev = cur
+        return total / (n - 1)
 
     # compute running average fps (floating-point)
     def fps(self) -> float:
@@ -75,3 +262,165 @@ class FPS:
     
     def tock_time(self) -> float:
         return time.ticks_diff(self.t_frame, self.t_tock) / 1000.0
+
+    # profiler: start timing of named section (registered automatically on first use)
+    def begin(self, name):
+        i = self.sect_idx.get(name, -1)
+        if i < 0:
+            i = self._register(name)
+        self.sect_t0[i] = time.ticks_us()
+
+    # profiler: stop timing of named section and add to accumulated time
+    def end(self, name):
+        t1 = time.ticks_us()
+        i = self.sect_idx[name]
+        dt = time.ticks_diff(t1, self.sect_t0[i])
+        self.sect_frame[i] += dt
+        if dt > self.sect_max[i]:
+            self.sect_max[i] = dt
+
+    def _register(self, name) -> int:
+        i = self.n_sect
+        if i >= self.max_sect:
+            raise Exception(f"too many profiler sections (max {self.max_sect})")
+        self.sect_names[i] = name
+        self.sect_idx[name] = i
+        self.n_sect += 1
+        return i
+
+    # average time per frame spent in section, approximating a running average like .fps()
+    def section_us(self, name) -> int:
+        i = self.sect_idx[name]
+        return (self.sect_accum[i] + (self.N - self.sect_n) * self.sect_prior[i]) // self.N
+
+    def section_ms(self, name) -> float:
+        return self.section_us(name) / 1000.0
+
+    # maximum time of a single begin/end pair in current and previous block of N frames
+    def section_max_us(self, name) -> int:
+        i = self.sect_idx[name]
+        return max(self.sect_max[i], self.sect_prior_max[i])
+
+    def section_max_ms(self, name) -> float:
+        return self.section_max_us(name) / 1000.0
+
+    # compact human-readable summary of all sections, e.g. for print() to the REPL
+    def summary(self) -> str:
+        lines = []
+        for i in range(self.n_sect):
+            name = self.sect_names[i]
+            lines.append(f"{name}: {self.section_ms(name):.2f}ms (max {self.section_max_ms(name):.2f}ms)")
+        return "\n".join(lines)
+
+
+class FixedStep:
+    def __init__(self, fps: FPS, hz=30, max_steps=4):
+        if hz < 1:
+            raise Exception("hz must be >= 1")
+        if max_steps < 1:
+            raise Exception("max_steps must be >= 1")
+        self.fps = fps
+        self.step_us = 1000000 // hz
+        self.dt = self.step_us / 1000000.0
+        self.dt_ms = self.step_us // 1000
+        self.max_steps = max_steps
+        self.accum_us = 0
+        self.n_dropped = 0
+
+    # add time of last frame to accumulator and return number of simulation steps now due
+    def steps(self) -> int:
+        acc = self.accum_us + self.fps.last_ms * 1000
+        step = self.step_us
+        n = acc // step
+        acc -= n * step
+        if n > self.max_steps:
+            self.n_dropped += n - self.max_steps
+            n = self.max_steps
+        self.accum_us = acc
+        return n
+
+    def alpha(self) -> float:
+        return self.accum_us / self.step_us
+
+    @staticmethod
+    def lerp(a: float, b: float, alpha: float) -> float:
+        return a + (b - a) * alpha
+
+    def dropped(self) -> int:
+        return self.n_dropped
+
+    # discard accumulated time, e.g. after a pause or loading screen
+    def reset(self):
+        self.accum_us = 0
+
+
+class Governor:
+    def __init__(self, fps: FPS, target_fps=30, levels=5, level=None,
+                 window=20, slack=15, hold=60):
+        if levels < 1:
+            raise Exception("levels must be >= 1")
+        self.fps = fps
+        self.levels = levels
+        self.level = levels - 1 if level is None else max(0, min(levels - 1, level))
+        self.window = window
+        self.hold = hold
+        target_us = 1000000 // target_fps
+        self.slow_ms = window * target_us * (100 + slack) // 100000 # thresholds for ms accumulated over window
+        self.fast_ms = window * target_us * (100 - slack) // 100000
+        self.retry = array("H", [0] * levels)   # back-off period (frames) after abandoning a level
+        self.blocked = array("l", [0] * levels) # frame counter until which level must not be raised to
+        self.settings = []
+        self.accum_ms = 0
+        self.n = 0
+        self.wait = hold
+
+    # register setting with one value per quality level, returns handle for .value()
+    def register(self, values) -> int:
+        if len(values) != self.levels:
+            raise Exception(f"need exactly one value for each of {self.levels} levels")
+        self.settings.append(values)
+        return len(self.settings) - 1
+
+    def value(self, k: int):
+        return self.settings[k][self.level]
+
+    # call once per frame after fps.tick(); returns True if quality level has changed
+    def update(self) -> bool:
+        if self.wait > 0:
+            self.wait -= 1
+            return False
+        self.accum_ms += self.fps.last_ms
+        self.n += 1
+        if self.n < self.window:
+            return False
+        accum = self.accum_ms
+        self.accum_ms = 0
+        self.n = 0
+        L = self.level
+        if accum > self.slow_ms:
+            if L == 0:
+                return False
+            r = 2 * self.retry[L] if self.retry[L] else self.hold
+            r = r if r < 8 * self.hold else 8 * self.hold
+            self.retry[L] = r
+            self.blocked[L] = self.fps.frame() + r
+            self._set(L - 1)
+            return True
+        r = self.retry[L] # level holds up: gradually forget earlier failures
+        self.retry[L] = r - self.window if r > self.window else 0
+        if accum < self.fast_ms and L < self.levels - 1:
+            if self.fps.frame() < self.blocked[L + 1]:
+                return False
+            self._set(L + 1)
+            return True
+        return False
+
+    # force quality level, e.g. when the player changes settings by hand
+    def set_level(self, level: int):
+        self._set(max(0, min(self.levels - 1, level)))
+
+    def _set(self, level: int):
+        self.level = level
+        self.wait = self.hold
+        self.accum_ms = 0
+        self.n = 0
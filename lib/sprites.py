@@ -1,4 +1,4 @@
-# SPRITES provides simple sprites with a maximal height of 24px
+# SPRITES provides simple sprites with a maximal height of 40px
 # and arbitrary width. The library aims to render sprites as
 # quickly as possible at the expense of some storage overhead, 
 # which can be substantial for small sprites.
@@ -7,18 +7,110 @@
 # bitmap data for a single sprite with background mask. They
 # are initialised with two byte arrays as generated by the
 # web editor. Keep in mind that the maximum height of a sprite
-# is 24px and that bitmap data need to be zero-padded to full
+# is 40px and that bitmap data need to be zero-padded to full
 # bytes if height is not a multiple of eight. There is no
 # support for frame animation or keeping track of the position
 # of a sprite; use the SpriteObj class for this purpose.
 #
-# spr = sprites.Sprite(width, height, bitmap, mask)
+# spr = sprites.Sprite(width, height, bitmap, mask, packed=False)
 #  - bitmap and mask must be bytearrays of appropriate size
 #    containing bitmap data in the same layout as the display
+#  - sprites store each column as a 32-bit word (LSB at top), which is repacked from the
+#    display layout in Python; if packed=True, bitmap and mask already are sequences of
+#    width such column words (e.g. array("I") or memoryview slices of one) and are used as is
+#  - sprites taller than 32 px have a second word per column for rows 32 .. 39; packed data
+#    of such sprites hold 2 * width words, the low words of all columns followed by the high
+#    words (as in packed asset files)
+#  - sprites of up to 24 px are drawn from single column words; taller sprites take a path
+#    that combines the two words of each column, still drawing every column in one pass
 #
-# spr.draw(x0, y0, invert)
+# frames = sprites.load(name, buf=None)
+#  - load all frames of a sprite asset file (see assets lib) as a list of Sprite objects
+#  - name is searched in the current directory and on sys.path
+#  - packed sprite assets (converted with tools/mkasset.py sprite --packed) are read directly
+#    into two arrays of column words shared by all frames, so no repacking is needed at all
+#  - otherwise, bitmap data are read into a temporary buffer, which can be preallocated and passed
+#    as buf (as bytearray of twice the plane size) to avoid heap fragmentation when loading many sprites
+#
+# sprites.save(path, frames)
+#  - write list of Sprite objects of equal size as packed sprite asset file, e.g. for sprites
+#    generated on the device
+#
+# hit = sprites.collide(spr_a, xa, ya, spr_b, xb, yb)
+#  - pixel-perfect collision test of two sprites drawn at pixel coordinates (xa, ya) and (xb, yb)
+#    (without mirroring)
+#  - True if the masks of both sprites overlap in at least one pixel
+#  - rejects sprites whose bounding boxes do not overlap first, then tests the mask words of all
+#    overlapping columns (one shift and one AND per column)
+#
+# hit = sprites.touches(spr, x0, y0)
+#  - whether the mask of spr drawn at (x0, y0) covers any pixel that is set in the framebuffer,
+#    e.g. to test against a background or level drawn before the sprite (but not the sprite itself)
+#
+# spr.draw(x0, y0, mode)
 #  - draw sprite with top left corner at pixel coordinates (x0, y0)
-#  - if invert=True, draw sprite in black on white (with same mask)
+#  - mode selects how bitmap and mask are combined with the screen (each in a single pass):
+#      + sprites.normal (0): draw bitmap in white, clear other pixels of the mask
+#      + sprites.inverted (1): draw bitmap in black, set other pixels of the mask
+#      + sprites.xor: toggle pixels of the bitmap, ignoring the mask (e.g. cursors)
+#      + sprites.silhouette: set all pixels of the mask (e.g. hit flashes)
+#      + sprites.outline: draw the edge of the mask in white and clear its inside
+#      + sprites.transparent: set pixels of the bitmap, ignoring the mask
+#  - False / True for the invert argument of earlier versions still work as normal / inverted
+#    (passed by position; obj.draw() and grp.draw() also accept invert= as a keyword)
+#  - add sprites.flip_h and / or sprites.flip_v to the mode to mirror the sprite horizontally
+#    (columns are read in reverse order) or vertically (bits of each column are reversed),
+#    e.g. for characters facing left and right, without storing a mirrored copy
+#  - pre-shifted sprites (see below) are drawn from the column words with flip_v or outline
+#
+# part = spr.view(x, y, w, h)
+#  - sprite showing the w x h px rectangle at (x, y) of spr, e.g. a single image of an atlas
+#  - shares the bitmap data of spr (memoryview slices of its columns and a row offset), so
+#    nothing is copied; views can be drawn, tested for collisions and used as frames like any
+#    other sprite
+#
+# ok = spr.preshift()
+#  - opt-in cache for sprites that are drawn many times per frame: precomputes the bitmap and
+#    mask for all 8 vertical bit shifts, so that drawing only combines bytes from a table
+#    instead of shifting the column words of every column
+#  - costs 16 * width * ((height + 14) // 8) bytes (e.g. 896 bytes for a 14 x 24 sprite)
+#  - returns False (and leaves the sprite unchanged) if the memory would exceed the limit
+#    for all pre-shifted sprites
+#
+# spr.unshift()
+#  - release the cache of a pre-shifted sprite
+#
+# sprites.preshift_limit = n
+#  - limit for the total memory of all pre-shifted sprites in bytes (default 4096)
+#
+# used, limit = sprites.preshift_memory()
+#  - current memory used by pre-shifted sprites and its limit in bytes
+#
+# Variants provide rotated and scaled copies of a sprite, which are rendered once (nearest
+# neighbour sampling of bitmap and mask) and then drawn as ordinary packed sprites.
+#
+# var = sprites.Variants(spr, angles=16, scales=[1.0], limit=8)
+#  - variants of sprite spr for angles evenly spaced over 360 degrees, each at all scales
+#  - all variants are size x size px squares that fit the sprite at any angle (size is the
+#    diagonal of spr times the largest scale, at most 40 px)
+#  - variants are generated when first needed; at most limit of them are kept, and the least
+#    recently used one is released when another one is needed (limit=0: keep all). Each
+#    variant takes 8 * size bytes (16 * size if size > 32), e.g. 224 bytes for a 14 x 24 sprite
+#
+# var = sprites.Variants(frames, angles=16, scales=[1.0])
+#  - use variants generated ahead of time, e.g. frames = sprites.load() of a file written by
+#    var.save() or by tools/mkasset.py variants; frames must hold angles * len(scales) sprites
+#
+# spr = var.get(angle, k=0)
+#  - variant closest to angle (in degrees, counter-clockwise as for shapes.ConvexPoly) at
+#    scale number k; the variant is found by index arithmetic, so lookups take constant time
+#
+# var.draw(cx, cy, angle, k=0, mode=sprites.normal)
+#  - draw variant centred at pixel (cx, cy) (see Sprite.draw() for modes)
+#
+# var.save(path)
+#  - generate all variants and write them as packed sprite asset file (in the order
+#    angle + k * angles), to be loaded instead of generating them again
 #
 # A SpriteObj is used to manage a sprite on the screen, with
 # automatic linear movement and frame animation. The actual
@@ -53,6 +145,26 @@
 # obj.frame(n)
 #  - display frame n (with n = 0 for first frame)
 #  - automatically clamped to available frames
+#  - stops the current animation clip; the displayed frame number is obj.frame_no
+#
+# clip = sprites.Clip(first, last, ms, mode=sprites.anim_loop)
+#  - animation of frames first .. last of a SpriteObj, each shown for ms milliseconds; ms is
+#    either a single duration or a list with one duration for each frame (1 .. 65535 ms)
+#  - mode: sprites.anim_once (stop on last frame), anim_loop (restart at first frame) or
+#    anim_pingpong (play forward and backward, e.g. 0 1 2 1 0 1 2 ...)
+#  - clips only hold frame numbers and durations, so one clip can be shared by many objects
+#
+# obj.play(clip, restart=False)
+#  - start animation clip, which is then advanced by obj.update(dt) from integer millisecond
+#    counters (no memory is allocated per frame)
+#  - playing the clip that is already running has no effect unless restart=True, so play()
+#    can be called on every tick (e.g. with the clip for the current direction of movement)
+#
+# obj.stop()
+#  - stop animation and keep displaying the current frame
+#
+# obj.playing()
+#  - whether a clip is running (False once an anim_once clip has reached its last frame)
 #
 # out_x, out_y = obj.onscreen(margin=0.0):
 #  - whether sprite is currently in visible screen range
@@ -64,25 +176,171 @@
 #  - whether sprite is visible (True) or not (False)
 #
 # obj.update(dt, ax=0.0, ay=0.0)
-#  - update position of sprite over dt seconds
+#  - update position and animation clip of sprite over dt seconds
 #  - can specify an additional global acceleration added to internal values
 #
-# obj.draw(invert=False)
-#  - draw sprite at current position (inverted if invert=True)
+# obj.draw(mode=sprites.normal)
+#  - draw sprite at current position (see Sprite.draw() for modes)
+#  - obj.draw(invert=True) of earlier versions still works (same as mode=sprites.inverted)
+#
+# hit = obj.collides(other)
+#  - pixel-perfect collision test with SpriteObj other (see sprites.collide()), using the current
+#    frames and the pixel positions at which the objects are drawn
+#  - independent of whether the objects are visible
+#
+# hit = obj.touches()
+#  - whether the sprite at its current position covers any pixel set in the framebuffer
+#    (see sprites.touches())
+#
+# A SpriteGroup manages many sprites that share a list of frames
+# (e.g. particles, enemies or the balloons demo) much more
+# efficiently than separate SpriteObj instances. The state of all
+# members is kept in parallel arrays of fixed-point integers
+# (position with a resolution of 1/256 px), so that one viper loop
+# updates and culls all members and one pass draws them, without
+# any method calls or float operations per member. A group of n
+# members takes 40 * n bytes, so it can hold hundreds of objects.
+#
+# grp = sprites.SpriteGroup(frames=[spr1, spr2, ...], n)
+#  - group with n member slots (numbered 0 .. n - 1), which are a pool of objects: only live
+#    members are updated and drawn, and no memory is allocated after construction
+#
+# i = grp.spawn(x, y, vx=0.0, vy=0.0, ax=0.0, ay=0.0, fx=0.0, fy=0.0, frame=0, visible=True)
+#  - take a free slot from the pool and initialise it as a live member (same meaning of
+#    arguments as for SpriteObj); returns the slot number i, or -1 if all slots are in use
+#
+# grp.despawn(i)
+#  - return member i to the pool (ignored if it is not live)
+#
+# grp.clear()
+#  - despawn all members
+#
+# grp.n_live, grp.live
+#  - number of live members and their slot numbers in grp.live[0 .. grp.n_live - 1]
+#    (in no particular order); spawn() and despawn() take constant time and keep this list
+#    dense, so iterating over live members never has to skip dead slots
+#
+# grp.set(i, x, y, vx=0.0, vy=0.0, ax=0.0, ay=0.0, fx=0.0, fy=0.0, frame=0, visible=True)
+#  - re-initialise all state of live member i
+#
+# grp.move(i, x, y), grp.speed(i, vx, vy), grp.accel(i, ax, ay), grp.friction(i, fx, fy),
+# grp.frame(i, n), grp.visible(i, visible)
+#  - change state of member i (same as corresponding SpriteObj methods)
+#
+# x, y = grp.pos(i)
+#  - current position of member i as floating-point numbers
+#
+# grp.cull(sides, margin=0.0)
+#  - select sides of the screen for culling: members outside the screen (extended by margin) on
+#    one of these sides are reported by grp.update()
+#  - sides is a combination of sprites.cull_left, cull_right, cull_top, cull_bottom (default: all)
+#
+# n_out = grp.update(dt, ax=0.0, ay=0.0)
+#  - update position of all live members over dt seconds (same as SpriteObj.update(), but dt is
+#    limited to 0.1 s to keep fixed-point products in range)
+#  - returns number of culled members, whose slot numbers are in grp.culled[0 .. n_out - 1]
+#    (e.g. to despawn or re-initialise them)
+#
+# out_x, out_y = grp.onscreen(i)
+#  - same as SpriteObj.onscreen() for member i, as determined by the last grp.update()
+#
+# hit = grp.collides(i, j), hit = grp.touches(i)
+#  - same as SpriteObj.collides() and SpriteObj.touches() for members i and j
+#
+# grp.draw(mode=sprites.normal)
+#  - draw all visible live members at their current positions
+#  - grp.draw(invert=True) of earlier versions still works (same as mode=sprites.inverted)
+#
+# A SpatialGrid is a broad-phase index that finds objects near a rectangle, or pairs of
+# objects whose bounding boxes overlap, without testing all n * n pairs. It divides the
+# screen (extended by a margin on all sides) into square cells, each holding a list of the
+# objects that cover it. All lists live in preallocated arrays, so rebuilding the index
+# every frame allocates no memory.
+#
+# grid = sprites.SpatialGrid(n, cell=8, margin=16, max_entries=0, obj_w=8, obj_h=8)
+#  - index for objects numbered 0 .. n - 1 (SpriteGroup slots or indices into a list)
+#  - cell is the cell size in px; a cell about the size of typical sprites works best
+#  - max_entries limits the total number of cells covered by all objects (an object of
+#    w x h px covers up to ((w + cell - 2) // cell + 1) * ((h + cell - 2) // cell + 1) cells);
+#    by default, it is enough for n objects of up to obj_w x obj_h px (e.g. pass the size of
+#    the largest frame)
+#
+# n_dropped = grid.build(objs)
+#  - clear index and insert all objects of a SpriteGroup (its live members) or of a list of
+#    SpriteObj instances, using the pixel positions at which they are drawn
+#  - objects outside the screen extended by the margin of the grid, i.e. those for which
+#    onscreen(margin) != (0, 0), are left out (independent of whether they are visible)
+#  - returns the number of objects that did not fit into max_entries (and are missing from
+#    query() and pairs() results), which should be 0
+#
+# grid.clear()
+# ok = grid.insert(i, x, y, w, h)
+#  - incremental use: remove all objects, or add object i with a bounding box of w x h px at
+#    pixel coordinates (x, y); objects beyond the margin are put into the outermost cells
+#  - returns False (and increments grid.dropped) if max_entries would be exceeded
+#
+# n_found = grid.query(x, y, w, h, out)
+#  - find all indexed objects whose bounding boxes overlap the rectangle of w x h px at (x, y)
+#  - object numbers are written to out (e.g. array("H") of length n), at most len(out)
+#
+# n_pairs = grid.pairs(out_a, out_b)
+#  - find all pairs of indexed objects with overlapping bounding boxes, each pair once with
+#    out_a[k] < out_b[k] for k in 0 .. n_pairs - 1 (at most len(out_a) pairs)
+#  - combine with collides() for pixel-perfect tests of the candidate pairs
 #
 
 import thumby
 import math
+import assets
 from array import array
 
+normal = const(0)      # drawing modes of Sprite.draw()
+inverted = const(1)
+xor = const(2)
+silhouette = const(3)
+outline = const(4)
+transparent = const(5)
+flip_h = const(8)      # flags combined with drawing modes
+flip_v = const(16)
+
+_rev8 = bytes(int("{:08b}".format(i)[::-1], 2) for i in range(256)) # bit-reversed bytes
+
+preshift_limit = 4096 # memory limit for all pre-shifted sprites (bytes)
+_preshift_used = 0
+
+def preshift_memory() -> (int, int):
+    return _preshift_used, preshift_limit
+
 class Sprite:
-    def __init__(self, width: int, height: int, bitmap: bytearray, mask: bytearray):
+    def __init__(self, width: int, height: int, bitmap: bytearray, mask: bytearray, packed: bool = False):
         if width < 1:
             raise Exception("width must be >= 1")
-        if height < 1 or height > 24:
-            raise Exception("height must be between 1px and 24px")
+        if height < 1 or height > 40:
+            raise Exception("height must be between 1px and 40px")
         self.width = width
         self.height = height
+        self.pre_b = None # pre-shifted bitmap and mask (see preshift())
+        self.pre_m = None
+        self.pre_nb = 0   # bytes per column in pre-shifted data, 0 if not cached
+        self.top = 0      # first row of the sprite within the column words (see view())
+        self.bitmap_hi = None # words with rows 32 .. 63 of each column (sprites > 24 px only)
+        self.mask_hi = None
+        self.has_hi = 0       # 1 if bitmap_hi and mask_hi are set (tested in viper code)
+        if packed:
+            n_words = 2 * width if height > 32 else width
+            if len(bitmap) != n_words or len(mask) != n_words:
+                raise Exception(f"packed bitmap data must have {n_words} column words")
+            if height > 32:
+                bitmap = memoryview(bitmap)
+                mask = memoryview(mask)
+                self.bitmap_hi = bitmap[width:]
+                self.mask_hi = mask[width:]
+                self.has_hi = 1
+                bitmap = bitmap[:width]
+                mask = mask[:width]
+            self.bitmap = bitmap
+            self.mask = mask
+            return
         h_bytes = (height + 7) // 8 # number of bytes required for each vertical scanline
         size = h_bytes * width
         if len(bitmap) != size:
@@ -91,16 +349,78 @@ class Sprite:
             raise Exception(f"not the right amount of mask data (expected {size} bytes)")
         self.bitmap = array("L", [0] * width)
         self.mask = array("L", [0] * width)
+        if height > 24:
+            self.bitmap_hi = array("L", [0] * width)
+            self.mask_hi = array("L", [0] * width)
+            self.has_hi = 1
         for x in range(width):
             b_long = m_long = 0 # 32bit integer holding bitmap data for one vertical scanline
-            for y in range(h_bytes):
+            for y in range(h_bytes if h_bytes <= 4 else 4):
                 b_long += bitmap[y * width + x] << (8 * y)
                 m_long += mask[y * width + x] << (8 * y)
             self.bitmap[x] = b_long
             self.mask[x] = m_long
+            if h_bytes > 4:
+                self.bitmap_hi[x] = bitmap[4 * width + x]
+                self.mask_hi[x] = mask[4 * width + x]
+
+    def _column(self, x: int, mask: bool) -> int:
+        # all rows of column x as one (long) integer
+        lo = self.mask if mask else self.bitmap
+        hi = self.mask_hi if mask else self.bitmap_hi
+        v = lo[x] if hi is None else lo[x] | (hi[x] << 32)
+        return (v >> self.top) & ((1 << self.height) - 1)
+
+    def view(self, x: int, y: int, w: int, h: int):
+        if x < 0 or y < 0 or w < 1 or h < 1 or x + w > self.width or y + h > self.height:
+            raise Exception("view must lie within the sprite")
+        spr = Sprite(w, 1, memoryview(self.bitmap)[x:x + w], memoryview(self.mask)[x:x + w], True)
+        spr.height = h # set after construction, which would expect high words in the same sequence
+        spr.top = self.top + y
+        if self.bitmap_hi is not None:
+            spr.bitmap_hi = memoryview(self.bitmap_hi)[x:x + w]
+            spr.mask_hi = memoryview(self.mask_hi)[x:x + w]
+            spr.has_hi = 1
+        return spr
+
+    def preshift(self) -> bool:
+        global _preshift_used
+        if self.pre_nb:
+            return True
+        w = self.width
+        nb = (self.height + 14) // 8 # bytes per column for the largest shift
+        size = 8 * w * nb
+        if _preshift_used + 2 * size > preshift_limit:
+            return False
+        pre_b = bytearray(size)
+        pre_m = bytearray(size)
+        i = 0
+        for shift in range(8):
+            for x in range(w):
+                b_long = self._column(x, False) << shift
+                m_long = self._column(x, True) << shift
+                for _ in range(nb):
+                    pre_b[i] = b_long & 0xff
+                    pre_m[i] = m_long & 0xff
+                    b_long >>= 8
+                    m_long >>= 8
+                    i += 1
+        self.pre_b = pre_b
+        self.pre_m = pre_m
+        self.pre_nb = nb
+        _preshift_used += 2 * size
+        return True
+
+    def unshift(self):
+        global _preshift_used
+        if self.pre_nb:
+            _preshift_used -= len(self.pre_b) + len(self.pre_m)
+            self.pre_b = None
+            self.pre_m = None
+            self.pre_nb = 0
 
     @micropython.viper
-    def draw(self, x0: int, y0: int, invert: bool):
+    def draw(self, x0: int, y0: int, mode: int):
         w = int(self.width)
         h = int(self.height)
         if x0 + w <= 0 or x0 >= 72 or y0 + h <= 0 or y0 >= 40:
@@ -117,29 +437,538 @@ class Sprite:
         if y_start + h_end > 5:
             h_end = 5 - y_start
 
+        # mirroring only changes the order in which columns (flip_h) or the bits of a column
+        # (flip_v) are read, so no data are copied
+        fh = mode & flip_h
+        fv = mode & flip_v
+        mode &= 7
+        # every mode is a single pass computing scr = ((scr & ~c) | t) ^ x, where the words
+        # c (pixels to clear), t (pixels to set) and x (pixels to toggle) are derived from
+        # bitmap b and mask m of each column
         scr = ptr8(thumby.display.display.buffer)
+        nb = int(self.pre_nb)
+        if nb and mode != outline and not fv:
+            # pre-shifted: bytes for this shift are stored column by column, nb bytes each
+            pb = ptr8(self.pre_b)
+            pm = ptr8(self.pre_m)
+            for dx in range(w_start, w_end):
+                sp = x0 + dx + y_off * 72
+                src = (shift * w + (w - 1 - dx if fh else dx)) * nb + h_start
+                if mode == normal:
+                    for k in range(h_start, h_end):
+                        scr[sp] = (scr[sp] & (0xff ^ pm[src])) | pb[src]
+                        src += 1
+                        sp += 72
+                elif mode == inverted:
+                    for k in range(h_start, h_end):
+                        scr[sp] = (scr[sp] | pm[src]) & (0xff ^ pb[src])
+                        src += 1
+                        sp += 72
+                elif mode == xor:
+                    for k in range(h_start, h_end):
+                        scr[sp] ^= pb[src]
+                        src += 1
+                        sp += 72
+                elif mode == silhouette:
+                    for k in range(h_start, h_end):
+                        scr[sp] |= pm[src]
+                        src += 1
+                        sp += 72
+                else: # transparent
+                    for k in range(h_start, h_end):
+                        scr[sp] |= pb[src]
+                        src += 1
+                        sp += 72
+            return
+        top = int(self.top)
+        if h > 24 or top + h > 32:
+            self._draw_tall(x0, y0, mode | fh | fv) # shifted columns do not fit into one word
+            return
+        bitmap = self.bitmap
+        mask = self.mask
+        rows = uint((1 << h) - 1)
+        ml = uint(0) # mask of left neighbour column (for outline mode)
+        if mode == outline and w_start > 0:
+            ml = (uint(mask[w - w_start if fh else w_start - 1]) >> top) & rows
+            if fv:
+                ml = uint(_reverse(ml, h))
         for dx in range(w_start, w_end):
             sp = x0 + dx + y_off * 72
-            b_long = uint(self.bitmap[dx]) << shift
-            m_long = uint(self.mask[dx]) << shift
-            b_long >>= (8 * h_start)
-            m_long >>= (8 * h_start)
-            if invert:
-                b_long ^= -1
-                for b in range(h_start, h_end):
-                    scr[sp] |= m_long # operates on lsb
-                    scr[sp] &= b_long
-                    m_long >>= 8
-                    b_long >>= 8
-                    sp += 72
+            sx = w - 1 - dx if fh else dx
+            b_long = (uint(bitmap[sx]) >> top) & rows
+            m_long = (uint(mask[sx]) >> top) & rows
+            if fv:
+                b_long = uint(_reverse(b_long, h))
+                m_long = uint(_reverse(m_long, h))
+            x_long = uint(0)
+            if mode == normal:
+                c_long = m_long
+                t_long = b_long
+            elif mode == inverted:
+                c_long = b_long
+                t_long = m_long & (m_long ^ b_long)
+            elif mode == xor:
+                c_long = uint(0)
+                t_long = uint(0)
+                x_long = b_long
+            elif mode == silhouette:
+                c_long = uint(0)
+                t_long = m_long
+            elif mode == outline:
+                # edge of the mask: mask pixels with a neighbour outside the mask
+                mr = uint(0)
+                if dx + 1 < w:
+                    mr = (uint(mask[sx - 1 if fh else sx + 1]) >> top) & rows
+                    if fv:
+                        mr = uint(_reverse(mr, h))
+                inner = m_long & (m_long << 1) & (m_long >> 1) & ml & mr
+                c_long = m_long
+                t_long = m_long ^ inner
+                ml = m_long
+            else: # transparent
+                c_long = uint(0)
+                t_long = b_long
+            c_long = (c_long << shift) >> (8 * h_start)
+            t_long = (t_long << shift) >> (8 * h_start)
+            x_long = (x_long << shift) >> (8 * h_start)
+            for k in range(h_start, h_end):
+                scr[sp] = ((scr[sp] & (0xff ^ c_long)) | t_long) ^ x_long # operates on lsb
+                c_long >>= 8
+                t_long >>= 8
+                x_long >>= 8
+                sp += 72
+    @micropython.viper
+    def _draw_tall(self, x0: int, y0: int, mode: int):
+        # same as the column word path of draw(), but each column is handled as a pair of
+        # words lo (rows 0 .. 31) and hi (rows 32 .. 63)
+        w = int(self.width)
+        h = int(self.height)
+        w_start = 0 if x0 >= 0 else 0 - x0
+        w_end = w if x0 + w <= 72 else 72 - x0
+        y_start = y0 // 8
+        h_start = 0 if y_start >= 0 else 0 - y_start
+        y_off = y_start if y_start >= 0 else 0
+        shift = y0 % 8
+        h_end = (h + shift + 7) // 8
+        if y_start + h_end > 5:
+            h_end = 5 - y_start
+        fh = mode & flip_h
+        fv = mode & flip_v
+        mode &= 7
+        scr = ptr8(thumby.display.display.buffer)
+        bitmap = self.bitmap
+        mask = self.mask
+        bitmap_hi = self.bitmap_hi
+        mask_hi = self.mask_hi
+        has_hi = int(self.has_hi)
+        top = int(self.top)
+        rows_lo = uint(-1) if h >= 32 else uint((1 << h) - 1)
+        rows_hi = uint((1 << (h - 32)) - 1) if h > 32 else uint(0)
+        n_planes = 3 if mode == outline else 2 # bitmap, mask (and mask of right neighbour)
+        b_lo = b_hi = m_lo = m_hi = r_lo = r_hi = l_lo = l_hi = uint(0)
+        # for outline mode, start one column early to get the mask of the left neighbour
+        d0 = w_start - 1 if mode == outline and w_start > 0 else w_start
+        for dx in range(d0, w_end):
+            sx = w - 1 - dx if fh else dx
+            for p in range(n_planes):
+                col = sx if p < 2 else (sx - 1 if fh else sx + 1)
+                lo = uint(0)
+                hi = uint(0)
+                if 0 <= col < w:
+                    if p == 0:
+                        lo = uint(bitmap[col])
+                        if has_hi:
+                            hi = uint(bitmap_hi[col])
+                    else:
+                        lo = uint(mask[col])
+                        if has_hi:
+                            hi = uint(mask_hi[col])
+                    if top >= 32:
+                        lo = hi >> (top - 32)
+                        hi = uint(0)
+                    elif top:
+                        lo = (lo >> top) | uint(hi << (32 - top))
+                        hi >>= top
+                    lo &= rows_lo
+                    hi &= rows_hi
+                    if fv: # reverse all 64 bits, then move the h rows back to the top
+                        rl = uint(_reverse(hi, 32))
+                        rh = uint(_reverse(lo, 32))
+                        s = 64 - h
+                        if s >= 32:
+                            lo = rh >> (s - 32)
+                            hi = uint(0)
+                        else:
+                            lo = (rl >> s) | uint(rh << (32 - s))
+                            hi = rh >> s
+                if p == 0:
+                    b_lo = lo
+                    b_hi = hi
+                elif p == 1:
+                    m_lo = lo
+                    m_hi = hi
+                else:
+                    r_lo = lo
+                    r_hi = hi
+            if dx < w_start: # left neighbour of the first visible column (outline mode)
+                l_lo = m_lo
+                l_hi = m_hi
+                continue
+            c_lo = c_hi = t_lo = t_hi = x_lo = x_hi = uint(0)
+            if mode == normal:
+                c_lo = m_lo
+                c_hi = m_hi
+                t_lo = b_lo
+                t_hi = b_hi
+            elif mode == inverted:
+                c_lo = b_lo
+                c_hi = b_hi
+                t_lo = m_lo & (m_lo ^ b_lo)
+                t_hi = m_hi & (m_hi ^ b_hi)
+            elif mode == xor:
+                x_lo = b_lo
+                x_hi = b_hi
+            elif mode == silhouette:
+                t_lo = m_lo
+                t_hi = m_hi
+            elif mode == outline:
+                inner_lo = m_lo & uint(m_lo << 1) & ((m_lo >> 1) | uint(m_hi << 31)) & l_lo & r_lo
+                inner_hi = m_hi & (uint(m_hi << 1) | (m_lo >> 31)) & (m_hi >> 1) & l_hi & r_hi
+                c_lo = m_lo
+                c_hi = m_hi
+                t_lo = m_lo ^ inner_lo
+                t_hi = m_hi ^ inner_hi
+                l_lo = m_lo
+                l_hi = m_hi
+            else: # transparent
+                t_lo = b_lo
+                t_hi = b_hi
+            if shift:
+                c_hi = uint(c_hi << shift) | (c_lo >> (32 - shift))
+                c_lo = uint(c_lo << shift)
+                t_hi = uint(t_hi << shift) | (t_lo >> (32 - shift))
+                t_lo = uint(t_lo << shift)
+                x_hi = uint(x_hi << shift) | (x_lo >> (32 - shift))
+                x_lo = uint(x_lo << shift)
+            sp = x0 + dx + y_off * 72
+            for k in range(h_start, h_end):
+                if k < 4:
+                    n = 8 * k
+                    c = c_lo >> n
+                    t = t_lo >> n
+                    x = x_lo >> n
+                else:
+                    n = 8 * (k - 4)
+                    c = c_hi >> n
+                    t = t_hi >> n
+                    x = x_hi >> n
+                scr[sp] = ((scr[sp] & (0xff ^ c)) | t) ^ x # operates on lsb
+                sp += 72
+
+@micropython.viper
+def _reverse(v: uint, h: int) -> uint:
+    # reverse the order of the lowest h bits of v (vertical mirroring of a column)
+    rev = ptr8(_rev8)
+    v = (uint(rev[v & 0xff]) << 24) | (uint(rev[(v >> 8) & 0xff]) << 16) | \
+        (uint(rev[(v >> 16) & 0xff]) << 8) | uint(rev[v >> 24])
+    return v >> (32 - h)
+
+def load(name: str, buf: bytearray = None) -> list:
+    path = assets.find(name)
+    kind, width, height, count = assets.info(path)
+    if kind == assets.PACKED:
+        bitmap, mask = assets.load(path, assets.PACKED)
+        bitmap = memoryview(bitmap)
+        mask = memoryview(mask)
+        n = len(bitmap) // count # words per frame
+        return [Sprite(width, height, bitmap[i * n:(i + 1) * n], mask[i * n:(i + 1) * n], True)
+                for i in range(count)]
+    size = assets.plane_size(width, height, count)
+    if buf is None or len(buf) < 2 * size:
+        buf = bytearray(2 * size)
+    mv = memoryview(buf)
+    bitmap, mask = assets.load(path, assets.SPRITE, mv[:size], mv[size:2 * size])
+    frame_size = size // count
+    return [Sprite(width, height, bitmap[i * frame_size:(i + 1) * frame_size], mask[i * frame_size:(i + 1) * frame_size])
+            for i in range(count)]
+
+def save(path: str, frames: list):
+    width = frames[0].width
+    height = frames[0].height
+    for spr in frames:
+        if spr.width != width or spr.height != height:
+            raise Exception("all frames must have the same size")
+    with open(path, "wb") as fh:
+        fh.write(assets.header(assets.PACKED, width, height, len(frames)))
+        # 32-bit words, independent of the sprite's array type (and of the row offset of views),
+        # with the low words of all columns of a frame followed by the high words
+        n_words = 2 if height > 32 else 1
+        for mask in (False, True):
+            for spr in frames:
+                col = [spr._column(x, mask) for x in range(width)]
+                for k in range(n_words):
+                    fh.write(array("I", [(v >> (32 * k)) & 0xffffffff for v in col]))
+
+
+@micropython.viper
+def collide(a, xa: int, ya: int, b, xb: int, yb: int) -> bool:
+    wa = int(a.width)
+    wb = int(b.width)
+    # broad phase: bounding boxes must overlap
+    if ya >= yb + int(b.height) or yb >= ya + int(a.height):
+        return False
+    x1 = xa if xa >= xb else xb
+    x2 = xa + wa if xa + wa <= xb + wb else xb + wb
+    if x1 >= x2:
+        return False
+    # exact test on overlapping columns, with the mask of the upper sprite shifted to the other
+    ta = int(a.top) # row offsets and row masks of views (see Sprite.view())
+    tb = int(b.top)
+    if ta + int(a.height) > 32 or tb + int(b.height) > 32:
+        return bool(_collide_tall(a, xa, ya, b, xb, yb, x1, x2))
+    ma = ptr32(a.mask)
+    mb = ptr32(b.mask)
+    ka = uint((1 << int(a.height)) - 1)
+    kb = uint((1 << int(b.height)) - 1)
+    dy = yb - ya
+    if dy >= 0:
+        for x in range(x1, x2):
+            if (((uint(ma[x - xa]) >> ta) & ka) >> dy) & ((uint(mb[x - xb]) >> tb) & kb):
+                return True
+    else:
+        dy = 0 - dy
+        for x in range(x1, x2):
+            if ((uint(ma[x - xa]) >> ta) & ka) & (((uint(mb[x - xb]) >> tb) & kb) >> dy):
+                return True
+    return False
+
+@micropython.viper
+def touches(spr, x0: int, y0: int) -> bool:
+    w = int(spr.width)
+    h = int(spr.height)
+    if x0 + w <= 0 or x0 >= 72 or y0 + h <= 0 or y0 >= 40:
+        return False
+    c0 = 0 if x0 >= 0 else 0 - x0
+    c1 = w if x0 + w <= 72 else 72 - x0
+    row = y0 >> 3
+    shift = y0 & 0x07
+    scr = ptr8(thumby.display.display.buffer)
+    top = int(spr.top)
+    if h > 24 or top + h > 32:
+        return bool(_touches_tall(spr, x0, y0, c0, c1))
+    m = ptr32(spr.mask)
+    rows = uint((1 << h) - 1)
+    for c in range(c0, c1):
+        # framebuffer column as 32-bit word starting at the byte row of the sprite's top
+        word = 0
+        for k in range(4):
+            r = row + k
+            if 0 <= r < 5:
+                word |= scr[r * 72 + x0 + c] << (8 * k)
+        if (uint(word) >> shift) & ((uint(m[c]) >> top) & rows):
+            return True
+    return False
+
+@micropython.viper
+def _collide_tall(a, xa: int, ya: int, b, xb: int, yb: int, x1: int, x2: int) -> int:
+    # collide() for sprites with rows beyond the first column word: columns are compared as
+    # pairs of words lo (rows 0 .. 31) and hi (rows 32 .. 63)
+    dy = yb - ya
+    a_lo = a_hi = b_lo = b_hi = uint(0)
+    for x in range(x1, x2):
+        for p in range(2):
+            spr = a if p == 0 else b
+            col = x - xa if p == 0 else x - xb
+            h = int(spr.height)
+            top = int(spr.top)
+            lo = uint(spr.mask[col])
+            hi = uint(spr.mask_hi[col]) if int(spr.has_hi) else uint(0)
+            if top >= 32:
+                lo = hi >> (top - 32)
+                hi = uint(0)
+            elif top:
+                lo = (lo >> top) | uint(hi << (32 - top))
+                hi >>= top
+            lo &= uint(-1) if h >= 32 else uint((1 << h) - 1)
+            hi &= uint((1 << (h - 32)) - 1) if h > 32 else uint(0)
+            # shift the upper sprite down to the rows of the other one
+            s = dy if p == 0 else 0 - dy
+            if s >= 32:
+                lo = hi >> (s - 32)
+                hi = uint(0)
+            elif s > 0:
+                lo = (lo >> s) | uint(hi << (32 - s))
+                hi >>= s
+            if p == 0:
+                a_lo = lo
+                a_hi = hi
             else:
-                m_long ^= -1
-                for b in range(h_start, h_end):
-                    scr[sp] &= m_long # operates on lsb
-                    scr[sp] |= b_long
-                    m_long >>= 8
-                    b_long >>= 8
-                    sp += 72
+                b_lo = lo
+                b_hi = hi
+        if (a_lo & b_lo) | (a_hi & b_hi):
+            return 1
+    return 0
+
+@micropython.viper
+def _touches_tall(spr, x0: int, y0: int, c0: int, c1: int) -> int:
+    # touches() for sprites taller than 24 px, with columns as pairs of words lo and hi
+    h = int(spr.height)
+    top = int(spr.top)
+    mask = spr.mask
+    mask_hi = spr.mask_hi
+    has_hi = int(spr.has_hi)
+    rows_lo = uint(-1) if h >= 32 else uint((1 << h) - 1)
+    rows_hi = uint((1 << (h - 32)) - 1) if h > 32 else uint(0)
+    row = y0 >> 3
+    shift = y0 & 0x07
+    scr = ptr8(thumby.display.display.buffer)
+    for c in range(c0, c1):
+        lo = uint(mask[c])
+        hi = uint(mask_hi[c]) if has_hi else uint(0)
+        if top >= 32:
+            lo = hi >> (top - 32)
+            hi = uint(0)
+        elif top:
+            lo = (lo >> top) | uint(hi << (32 - top))
+            hi >>= top
+        lo &= rows_lo
+        hi &= rows_hi
+        # framebuffer column as pair of words starting at the byte row of the sprite's top
+        f_lo = uint(0)
+        f_hi = uint(0)
+        for k in range(6):
+            r = row + k
+            if 0 <= r < 5:
+                if k < 4:
+                    f_lo |= uint(scr[r * 72 + x0 + c]) << (8 * k)
+                else:
+                    f_hi |= uint(scr[r * 72 + x0 + c]) << (8 * (k - 4))
+        if shift:
+            f_lo = (f_lo >> shift) | uint(f_hi << (32 - shift))
+            f_hi >>= shift
+        if (f_lo & lo) | (f_hi & hi):
+            return 1
+    return 0
+
+
+class Variants:
+    def __init__(self, source, angles: int = 16, scales: list = None, limit: int = 8):
+        scales = [1.0] if scales is None else list(scales)
+        n = angles * len(scales)
+        self.angles = angles
+        self.scales = scales
+        self.n = n
+        if isinstance(source, list):
+            if len(source) != n:
+                raise Exception(f"{angles} angles at {len(scales)} scales need {n} frames")
+            self.source = None
+            self.size = source[0].width
+            limit = n
+            self.cache = list(source)
+        else:
+            size = int(math.ceil(math.sqrt(source.width ** 2 + source.height ** 2) * max(scales)))
+            if size > 40:
+                raise Exception(f"rotated sprite needs {size} x {size} px, at most 40 px are possible")
+            self.source = source
+            self.size = size
+            limit = n if limit <= 0 or limit > n else limit
+            self.cache = [None] * limit
+        self.slot_of = array("h", [-1] * n)        # cache slot of each variant, -1 if not cached
+        self.variant_of = array("h", [-1] * limit) # variant held by each cache slot
+        self.used = [0] * limit                    # tick of last use of each cache slot
+        self.tick = 0
+        if self.source is None:
+            for i in range(n):
+                self.slot_of[i] = i
+                self.variant_of[i] = i
+
+    def _make(self, i: int):
+        # render variant i by sampling the source at the inverse rotation of each pixel centre
+        src = self.source
+        w = src.width
+        h = src.height
+        size = self.size
+        scale = self.scales[i // self.angles]
+        phi = 2.0 * math.pi * (i % self.angles) / self.angles
+        C = round(math.cos(phi), 9) / scale # exact 0 and 1 at right angles
+        S = round(math.sin(phi), 9) / scale
+        b_cols = [src._column(x, False) for x in range(w)]
+        m_cols = [src._column(x, True) for x in range(w)]
+        n_words = 2 if size > 32 else 1
+        bitmap = array("I", [0] * (n_words * size))
+        mask = array("I", [0] * (n_words * size))
+        c = size / 2.0
+        for x in range(size):
+            u = x + 0.5 - c
+            b = m = 0
+            for y in range(size):
+                v = y + 0.5 - c
+                sx = int(math.floor(C * u - S * v + w / 2.0))
+                sy = int(math.floor(S * u + C * v + h / 2.0))
+                if 0 <= sx < w and 0 <= sy < h:
+                    b |= ((b_cols[sx] >> sy) & 1) << y
+                    m |= ((m_cols[sx] >> sy) & 1) << y
+            bitmap[x] = b & 0xffffffff
+            mask[x] = m & 0xffffffff
+            if n_words == 2:
+                bitmap[size + x] = b >> 32
+                mask[size + x] = m >> 32
+        return Sprite(size, size, bitmap, mask, True)
+
+    @micropython.native
+    def get(self, angle: float, k: int = 0):
+        a = int(math.floor(angle * self.angles / 360.0 + 0.5)) % self.angles
+        i = k * self.angles + a
+        self.tick += 1
+        slot = self.slot_of[i]
+        if slot < 0:
+            # replace least recently used variant (or fill an empty slot)
+            used = self.used
+            slot = 0
+            for j in range(1, len(used)):
+                if used[j] < used[slot]:
+                    slot = j
+            old = self.variant_of[slot]
+            if old >= 0:
+                self.slot_of[old] = -1
+            self.cache[slot] = None # release old variant before rendering the new one
+            self.cache[slot] = self._make(i)
+            self.slot_of[i] = slot
+            self.variant_of[slot] = i
+        self.used[slot] = self.tick
+        return self.cache[slot]
+
+    @micropython.native
+    def draw(self, cx: int, cy: int, angle: float, k: int = 0, mode: int = normal):
+        half = self.size >> 1
+        self.get(angle, k).draw(cx - half, cy - half, mode)
+
+    def save(self, path: str):
+        if self.source is None:
+            save(path, self.cache)
+        else:
+            save(path, [self._make(i) for i in range(self.n)])
+
+
+anim_once = const(0)      # modes of animation clips
+anim_loop = const(1)
+anim_pingpong = const(2)
+
+class Clip:
+    def __init__(self, first: int, last: int, ms, mode: int = anim_loop):
+        if last < first:
+            raise Exception("last frame must not precede first frame")
+        n = last - first + 1
+        ms = [ms] * n if isinstance(ms, int) else list(ms)
+        if len(ms) != n:
+            raise Exception(f"clip of {n} frames needs {n} durations")
+        for t in ms:
+            if t < 1 or t > 0xffff:
+                raise Exception("frame durations must be 1 .. 65535 ms")
+        self.first = first
+        self.n = n
+        self.ms = array("H", ms)
+        self.mode = mode
 
 
 class SpriteObj:
@@ -155,6 +984,11 @@ class SpriteObj:
         self.friction(fx, fy)
         self.frame(frame)
         self.visible(visible)
+        self.anim_step = 0
+        self.anim_dir = 1
+        self.anim_ms = 0
+        self.anim_us = 0
+        self.anim_done = False
         
     @micropython.native
     def move(self, x: float, y: float):
@@ -178,7 +1012,59 @@ class SpriteObj:
 
     @micropython.native
     def frame(self, n: int):
-        self.frame = 0 if n < 0 else self.n_frames - 1 if n >= self.n_frames else n
+        self.frame_no = 0 if n < 0 else self.n_frames - 1 if n >= self.n_frames else n
+        self.clip = None
+
+    def play(self, clip, restart: bool = False):
+        if clip is self.clip and not restart:
+            return
+        if clip.first < 0 or clip.first + clip.n > self.n_frames:
+            raise Exception("clip uses frames beyond the frame list")
+        self.clip = clip
+        self.anim_step = 0
+        self.anim_dir = 1
+        self.anim_ms = 0
+        self.anim_us = 0
+        self.anim_done = False
+        self.frame_no = clip.first
+
+    def stop(self):
+        self.clip = None
+
+    def playing(self) -> bool:
+        return self.clip is not None and not self.anim_done
+
+    @micropython.native
+    def _animate(self, dt: float):
+        clip = self.clip
+        us = self.anim_us + int(dt * 1000000.0) # keep sub-millisecond rest to avoid drift
+        t = self.anim_ms + us // 1000
+        self.anim_us = us % 1000
+        ms = clip.ms
+        n = clip.n
+        mode = clip.mode
+        step = self.anim_step
+        while t >= ms[step]:
+            t -= ms[step]
+            if mode == anim_loop:
+                step = step + 1 if step < n - 1 else 0
+            elif mode == anim_pingpong:
+                if n == 1:
+                    continue
+                d = self.anim_dir
+                if step + d < 0 or step + d >= n:
+                    d = -d
+                    self.anim_dir = d
+                step += d
+            elif step < n - 1:
+                step += 1
+            else: # anim_once: stay on last frame
+                self.anim_done = True
+                t = 0
+                break
+        self.anim_ms = t
+        self.anim_step = step
+        self.frame_no = clip.first + step
 
     @micropython.native
     def visible(self, visible: bool):
@@ -186,8 +1072,8 @@ class SpriteObj:
 
     @micropython.native
     def onscreen(self, margin=0.0) -> (int, int):
-        w = self.frames[self.frame].width
-        h = self.frames[self.frame].height
+        w = self.frames[self.frame_no].width
+        h = self.frames[self.frame_no].height
         out_x = -1 if (self.x + w + margin < 0.0) else 1 if (self.x >= 72.0 + margin) else 0
         out_y = -1 if (self.y + h + margin < 0.0) else 1 if (self.y >= 40.0 + margin) else 0
         return out_x, out_y
@@ -208,11 +1094,429 @@ class SpriteObj:
         self.vy = vy
         self.x += self.vx * dt
         self.y += self.vy * dt
+        if self.clip is not None and not self.anim_done:
+            self._animate(dt)
 
     @micropython.native
-    def draw(self, invert: bool = False):
+    def draw(self, mode: int = normal, invert: bool = False):
+        if invert:
+            mode = inverted
         if self.is_visible:
             x = int(math.floor(self.x + 0.5))
             y = int(math.floor(self.y + 0.5))
-            spr = self.frames[self.frame]
-            spr.draw(x, y, invert)
+            spr = self.frames[self.frame_no]
+            spr.draw(x, y, mode)
+
+    @micropython.native
+    def collides(self, other) -> bool:
+        return collide(self.frames[self.frame_no], int(math.floor(self.x + 0.5)), int(math.floor(self.y + 0.5)),
+                       other.frames[other.frame_no], int(math.floor(other.x + 0.5)), int(math.floor(other.y + 0.5)))
+
+    @micropython.native
+    def touches(self) -> bool:
+        return touches(self.frames[self.frame_no], int(math.floor(self.x + 0.5)), int(math.floor(self.y + 0.5)))
+
+
+cull_left = const(1)   # sides of the screen for SpriteGroup.cull()
+cull_right = const(2)
+cull_top = const(4)
+cull_bottom = const(8)
+
+class SpriteGroup:
+    def __init__(self, frames: list, n: int):
+        self.frames = frames
+        self.n_frames = len(frames)
+        self.capacity = n
+        self.live = array("H", [0] * n)          # dense list of live slots
+        self.live_pos = array("H", [0xffff] * n) # position of each slot in live (0xffff = free)
+        self.free = array("H", [n - 1 - i for i in range(n)]) # stack of free slots
+        self.n_live = 0
+        self.n_free = n
+        self.x = array("l", [0] * n)  # position in 1/256 px
+        self.y = array("l", [0] * n)
+        self.vx = array("l", [0] * n) # speed in 1/256 px per second
+        self.vy = array("l", [0] * n)
+        self.ax = array("l", [0] * n) # acceleration in 1/256 px per second^2
+        self.ay = array("l", [0] * n)
+        self.fx = array("H", [0] * n) # friction in 1/4096 per second
+        self.fy = array("H", [0] * n)
+        self.fr = bytearray(n)        # frame number
+        self.vis = bytearray(n)       # visible flag
+        self.out_x = array("b", [0] * n) # result of onscreen() after last update
+        self.out_y = array("b", [0] * n)
+        self.culled = array("H", [0] * n) # indices of members outside screen after last update
+        self.width = array("B", [spr.width for spr in frames])
+        self.height = array("B", [spr.height for spr in frames])
+        self.cull(cull_left | cull_right | cull_top | cull_bottom)
+
+    def cull(self, sides: int, margin: float = 0.0):
+        self.cull_sides = sides
+        self.margin = int(margin * 256)
+
+    @micropython.native
+    def spawn(self, x: float, y: float, vx: float = 0.0, vy: float = 0.0,
+              ax: float = 0.0, ay: float = 0.0, fx: float = 0.0, fy: float = 0.0,
+              frame: int = 0, visible: bool = True) -> int:
+        if self.n_free == 0:
+            return -1
+        self.n_free -= 1
+        i = self.free[self.n_free]
+        self.live[self.n_live] = i
+        self.live_pos[i] = self.n_live
+        self.n_live += 1
+        self.set(i, x, y, vx, vy, ax, ay, fx, fy, frame, visible)
+        return i
+
+    @micropython.native
+    def despawn(self, i: int):
+        p = self.live_pos[i]
+        if p == 0xffff:
+            return
+        self.n_live -= 1
+        last = self.live[self.n_live] # move last live slot into the gap
+        self.live[p] = last
+        self.live_pos[last] = p
+        self.live_pos[i] = 0xffff
+        self.free[self.n_free] = i
+        self.n_free += 1
+
+    def clear(self):
+        while self.n_live > 0:
+            self.despawn(self.live[self.n_live - 1])
+
+    def set(self, i: int, x: float, y: float, vx: float = 0.0, vy: float = 0.0,
+            ax: float = 0.0, ay: float = 0.0, fx: float = 0.0, fy: float = 0.0,
+            frame: int = 0, visible: bool = True):
+        self.move(i, x, y)
+        self.speed(i, vx, vy)
+        self.accel(i, ax, ay)
+        self.friction(i, fx, fy)
+        self.frame(i, frame)
+        self.visible(i, visible)
+        self.out_x[i] = 0
+        self.out_y[i] = 0
+
+    def move(self, i: int, x: float, y: float):
+        self.x[i] = int(x * 256.0)
+        self.y[i] = int(y * 256.0)
+
+    def speed(self, i: int, vx: float, vy: float):
+        self.vx[i] = int(vx * 256.0)
+        self.vy[i] = int(vy * 256.0)
+
+    def accel(self, i: int, ax: float, ay: float):
+        self.ax[i] = int(ax * 256.0)
+        self.ay[i] = int(ay * 256.0)
+
+    def friction(self, i: int, fx: float, fy: float):
+        self.fx[i] = 0 if fx <= 0.0 else int(fx * 4096.0) if fx < 16.0 else 65535
+        self.fy[i] = 0 if fy <= 0.0 else int(fy * 4096.0) if fy < 16.0 else 65535
+
+    def frame(self, i: int, n: int):
+        self.fr[i] = 0 if n < 0 else self.n_frames - 1 if n >= self.n_frames else n
+
+    def visible(self, i: int, visible: bool):
+        self.vis[i] = 1 if visible else 0
+
+    def pos(self, i: int) -> (float, float):
+        return self.x[i] / 256.0, self.y[i] / 256.0
+
+    def onscreen(self, i: int) -> (int, int):
+        return self.out_x[i], self.out_y[i]
+
+    @micropython.native
+    def collides(self, i: int, j: int) -> bool:
+        return collide(self.frames[self.fr[i]], (self.x[i] + 128) >> 8, (self.y[i] + 128) >> 8,
+                       self.frames[self.fr[j]], (self.x[j] + 128) >> 8, (self.y[j] + 128) >> 8)
+
+    @micropython.native
+    def touches(self, i: int) -> bool:
+        return touches(self.frames[self.fr[i]], (self.x[i] + 128) >> 8, (self.y[i] + 128) >> 8)
+
+    @micropython.native
+    def update(self, dt: float, ax: float = 0.0, ay: float = 0.0) -> int:
+        dt = dt if dt <= 0.1 else 0.1 # keep products of 32-bit fixed-point values in range
+        return self._update(int(dt * 65536.0), int(ax * 256.0), int(ay * 256.0))
+
+    @micropython.viper
+    def _update(self, dts: int, gax: int, gay: int) -> int:
+        # dts is the time step in 1/65536 s, so that products with dts >> 16 scale per-second values
+        x = ptr32(self.x)
+        y = ptr32(self.y)
+        vx = ptr32(self.vx)
+        vy = ptr32(self.vy)
+        ax = ptr32(self.ax)
+        ay = ptr32(self.ay)
+        fx = ptr16(self.fx)
+        fy = ptr16(self.fy)
+        fr = ptr8(self.fr)
+        out_x = ptr8(self.out_x)
+        out_y = ptr8(self.out_y)
+        culled = ptr16(self.culled)
+        width = ptr8(self.width)
+        height = ptr8(self.height)
+        sides = int(self.cull_sides)
+        margin = int(self.margin)
+        right = (72 << 8) + margin
+        bottom = (40 << 8) + margin
+        live = ptr16(self.live)
+        n_culled = 0
+        for j in range(int(self.n_live)):
+            i = live[j]
+            # all products are rounded to keep fixed-point errors from accumulating
+            v = vx[i] + (((ax[i] + gax) * dts + 0x8000) >> 16)
+            f = (fx[i] * dts + 0x8000) >> 16
+            f = f if f <= 4096 else 4096 # don't decelerate past full stop
+            v -= (v * f + 0x800) >> 12
+            vx[i] = v
+            x[i] += (v * dts + 0x8000) >> 16
+            v = vy[i] + (((ay[i] + gay) * dts + 0x8000) >> 16)
+            f = (fy[i] * dts + 0x8000) >> 16
+            f = f if f <= 4096 else 4096
+            v -= (v * f + 0x800) >> 12
+            vy[i] = v
+            y[i] += (v * dts + 0x8000) >> 16
+            # cull against screen with same semantics as SpriteObj.onscreen()
+            k = fr[i]
+            px = x[i]
+            py = y[i]
+            o_x = -1 if px + (width[k] << 8) + margin < 0 else 1 if px >= right else 0
+            o_y = -1 if py + (height[k] << 8) + margin < 0 else 1 if py >= bottom else 0
+            out_x[i] = o_x
+            out_y[i] = o_y
+            side = (cull_left if o_x < 0 else cull_right if o_x > 0 else 0) | \
+                   (cull_top if o_y < 0 else cull_bottom if o_y > 0 else 0)
+            if side & sides:
+                culled[n_culled] = i
+                n_culled += 1
+        return n_culled
+
+    @micropython.native
+    def draw(self, mode: int = normal, invert: bool = False):
+        self._draw(inverted if invert else mode)
+
+    @micropython.viper
+    def _draw(self, mode: int):
+        x = ptr32(self.x)
+        y = ptr32(self.y)
+        fr = ptr8(self.fr)
+        vis = ptr8(self.vis)
+        live = ptr16(self.live)
+        frames = self.frames
+        for j in range(int(self.n_live)):
+            i = live[j]
+            if vis[i]:
+                frames[fr[i]].draw((x[i] + 128) >> 8, (y[i] + 128) >> 8, mode)
+
+
+class SpatialGrid:
+    def __init__(self, n: int, cell: int = 8, margin: int = 16, max_entries: int = 0,
+                 obj_w: int = 8, obj_h: int = 8):
+        self.n = n
+        self.cell = cell
+        self.margin = margin
+        self.cols = (72 + 2 * margin + cell - 1) // cell
+        self.rows = (40 + 2 * margin + cell - 1) // cell
+        if max_entries <= 0: # cells covered by n objects of obj_w x obj_h px at any position
+            max_entries = n * ((obj_w + cell - 2) // cell + 1) * ((obj_h + cell - 2) // cell + 1)
+        self.max_entries = max_entries
+        # cells are singly linked lists of entries (0xffff = end of list), one entry for each
+        # cell covered by an object
+        self.head = array("H", [0xffff] * (self.cols * self.rows))
+        self.next = array("H", [0xffff] * self.max_entries)
+        self.entry = array("H", [0] * self.max_entries) # object number of each entry
+        self.n_entries = 0
+        self.n_indexed = 0
+        self.dropped = 0
+        # bounding box of each indexed object, coordinates offset by 0x8000 to keep them unsigned
+        self.ox = array("H", [0] * n)
+        self.oy = array("H", [0] * n)
+        self.ow = array("H", [0] * n)
+        self.oh = array("H", [0] * n)
+        self.stamp = array("H", [0] * n) # number of last query that visited each object
+        self.query_no = 0
+
+    @micropython.viper
+    def clear(self):
+        head = ptr16(self.head)
+        for c in range(int(self.cols) * int(self.rows)):
+            head[c] = 0xffff
+        self.n_entries = 0
+        self.n_indexed = 0
+        self.dropped = 0
+
+    @micropython.viper
+    def insert(self, i: int, x: int, y: int, w: int, h: int) -> bool:
+        margin = int(self.margin)
+        cell = int(self.cell)
+        cols = int(self.cols)
+        rows = int(self.rows)
+        # range of covered cells, clamped to the grid
+        cx0 = (x + margin) // cell
+        cx1 = (x + w - 1 + margin) // cell
+        cy0 = (y + margin) // cell
+        cy1 = (y + h - 1 + margin) // cell
+        cx0 = 0 if cx0 < 0 else cols - 1 if cx0 >= cols else cx0
+        cx1 = 0 if cx1 < 0 else cols - 1 if cx1 >= cols else cx1
+        cy0 = 0 if cy0 < 0 else rows - 1 if cy0 >= rows else cy0
+        cy1 = 0 if cy1 < 0 else rows - 1 if cy1 >= rows else cy1
+        e = int(self.n_entries)
+        if e + (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > int(self.max_entries):
+            self.dropped = int(self.dropped) + 1
+            return False
+        ox = ptr16(self.ox)
+        oy = ptr16(self.oy)
+        ow = ptr16(self.ow)
+        oh = ptr16(self.oh)
+        ox[i] = x + 0x8000
+        oy[i] = y + 0x8000
+        ow[i] = w
+        oh[i] = h
+        head = ptr16(self.head)
+        nxt = ptr16(self.next)
+        entry = ptr16(self.entry)
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                c = cy * cols + cx
+                entry[e] = i
+                nxt[e] = head[c]
+                head[c] = e
+                e += 1
+        self.n_entries = e
+        self.n_indexed = int(self.n_indexed) + 1
+        return True
+
+    @micropython.viper
+    def _build_group(self, grp):
+        x = ptr32(grp.x)
+        y = ptr32(grp.y)
+        fr = ptr8(grp.fr)
+        width = ptr8(grp.width)
+        height = ptr8(grp.height)
+        live = ptr16(grp.live)
+        margin = int(self.margin) << 8
+        right = (72 << 8) + margin
+        bottom = (40 << 8) + margin
+        for j in range(int(grp.n_live)):
+            i = live[j]
+            k = fr[i]
+            px = x[i]
+            py = y[i]
+            # skip members outside the screen and margin, as in SpriteGroup.update()
+            if px + (width[k] << 8) + margin < 0 or px >= right or py + (height[k] << 8) + margin < 0 or py >= bottom:
+                continue
+            self.insert(i, (px + 128) >> 8, (py + 128) >> 8, width[k], height[k])
+
+    def build(self, objs) -> int:
+        self.clear()
+        if isinstance(objs, SpriteGroup):
+            self._build_group(objs)
+            return self.dropped
+        margin = self.margin
+        right = 72.0 + margin
+        bottom = 40.0 + margin
+        for i in range(len(objs)):
+            obj = objs[i]
+            spr = obj.frames[obj.frame_no]
+            x = obj.x
+            y = obj.y
+            # same test as obj.onscreen(margin) == (0, 0), without creating a tuple
+            if x + spr.width + margin < 0.0 or x >= right or y + spr.height + margin < 0.0 or y >= bottom:
+                continue
+            self.insert(i, int(math.floor(x + 0.5)), int(math.floor(y + 0.5)), spr.width, spr.height)
+        return self.dropped
+
+    @micropython.viper
+    def query(self, x: int, y: int, w: int, h: int, out) -> int:
+        stamp = ptr16(self.stamp)
+        q = int(self.query_no) + 1
+        if q > 0xffff: # query numbers wrap around: forget old stamps
+            for i in range(int(self.n)):
+                stamp[i] = 0
+            q = 1
+        self.query_no = q
+        margin = int(self.margin)
+        cell = int(self.cell)
+        cols = int(self.cols)
+        rows = int(self.rows)
+        cx0 = (x + margin) // cell
+        cx1 = (x + w - 1 + margin) // cell
+        cy0 = (y + margin) // cell
+        cy1 = (y + h - 1 + margin) // cell
+        cx0 = 0 if cx0 < 0 else cols - 1 if cx0 >= cols else cx0
+        cx1 = 0 if cx1 < 0 else cols - 1 if cx1 >= cols else cx1
+        cy0 = 0 if cy0 < 0 else rows - 1 if cy0 >= rows else cy0
+        cy1 = 0 if cy1 < 0 else rows - 1 if cy1 >= rows else cy1
+        head = ptr16(self.head)
+        nxt = ptr16(self.next)
+        entry = ptr16(self.entry)
+        ox = ptr16(self.ox)
+        oy = ptr16(self.oy)
+        ow = ptr16(self.ow)
+        oh = ptr16(self.oh)
+        res = ptr16(out)
+        n_max = int(len(out))
+        x += 0x8000
+        y += 0x8000
+        n = 0
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                e = head[cy * cols + cx]
+                while e != 0xffff:
+                    i = entry[e]
+                    e = nxt[e]
+                    if stamp[i] == q: # already tested in another cell
+                        continue
+                    stamp[i] = q
+                    bx = ox[i]
+                    by = oy[i]
+                    if bx < x + w and x < bx + ow[i] and by < y + h and y < by + oh[i] and n < n_max:
+                        res[n] = i
+                        n += 1
+        return n
+
+    @micropython.viper
+    def pairs(self, out_a, out_b) -> int:
+        margin = int(self.margin)
+        cell = int(self.cell)
+        cols = int(self.cols)
+        rows = int(self.rows)
+        head = ptr16(self.head)
+        nxt = ptr16(self.next)
+        entry = ptr16(self.entry)
+        ox = ptr16(self.ox)
+        oy = ptr16(self.oy)
+        ow = ptr16(self.ow)
+        oh = ptr16(self.oh)
+        res_a = ptr16(out_a)
+        res_b = ptr16(out_b)
+        n_max = int(len(out_a))
+        n = 0
+        for c in range(cols * rows):
+            e1 = head[c]
+            while e1 != 0xffff:
+                a = entry[e1]
+                ax = ox[a]
+                ay = oy[a]
+                aw = ow[a]
+                ah = oh[a]
+                e2 = nxt[e1]
+                while e2 != 0xffff:
+                    b = entry[e2]
+                    e2 = nxt[e2]
+                    bx = ox[b]
+                    by = oy[b]
+                    if not (bx < ax + aw and ax < bx + ow[b] and by < ay + ah and ay < by + oh[b]):
+                        continue
+                    # a pair shares all cells covered by its overlap: only report it in the cell
+                    # of the top left corner of the overlap
+                    cx = ((ax if ax >= bx else bx) - 0x8000 + margin) // cell
+                    cy = ((ay if ay >= by else by) - 0x8000 + margin) // cell
+                    cx = 0 if cx < 0 else cols - 1 if cx >= cols else cx
+                    cy = 0 if cy < 0 else rows - 1 if cy >= rows else cy
+                    if cy * cols + cx == c and n < n_max:
+                        res_a[n] = a if a < b else b
+                        res_b[n] = b if a < b else a
+                        n += 1
+                e1 = nxt[e1]
+        return n
@@ -1,7 +1,12 @@
-# TEXTMODE implements a 10 x 5 character text mode display with fixed character positions.
-# It comes with its own 7x8 pixel font and can optionally overlay text over other graphics. 
+# TEXTMODE implements a character text mode display with fixed character positions.
+# It comes with its own fonts and can optionally overlay text over other graphics. 
 # The module emphasises simplicity of use (no setup needed) and rendering efficiency.
-# It only supports uppercase letters A-Z, digits 0-9, and some ASCII punctuation, for a total
+# Two fonts are included: the default 7x8 pixel font (10 x 5 characters on screen) and a
+# 3x5 pixel font in 4x5 cells (18 x 8 characters). Fonts are loaded from asset files
+# (font7x8.tba, font3x5.tba) on first use, which must be installed in a directory on
+# sys.path (e.g. /lib next to the module, see the assets lib). Further fonts can be compiled
+# with tools/mkfont.py, which also derives the outline of each glyph automatically.
+# Fonts only support uppercase letters A-Z, digits 0-9, and some ASCII punctuation, for a total
 # character set of 64 code points covering the ASCII range 32 .. 95. A few code points have
 # been substituted by special symbols:
 #   &  heart
@@ -13,8 +18,15 @@
 #   _  down arrow
 #   \  unsupported character (code 60 = ASCII 92)
 #
+# textmode.set_font(font), textmode.get_font()
+#  - select the font used by all module functions below (default: textmode.font7x8)
+#  - font = textmode.Font(file, width, height) describes a font asset with cells of width x height
+#    px (height up to 8); glyph data are loaded when the font is first used
+#  - text coordinates below refer to the grid of font.cols x font.rows cells; with fonts that are
+#    not 8 px high, rows are rendered like draw_text()
+#
 # textmode.print_text(x, y, text, mode)
-#  - x (0 .. 9), y (0 .. 4): text coordinates of first character to be displayed
+#  - x (0 .. 9), y (0 .. 4): text coordinates of first character to be displayed (for the 7x8 font)
 #  - text: a Python string with text to be rendered (\n = line break)
 #  - mode: rendering mode, represented by a module constant
 #      + textmode.block: normal rendering of white text with black background
@@ -25,15 +37,136 @@
 #
 # textmode.scroll_text(x, y, text, mode)
 #  - x (0 .. 71): pixel position where string is displayed (x < 0 also allowed)
-#  - similar to print_text(), but allows fine positioning of text in five fixed rows
+#  - similar to print_text(), but allows fine positioning of text in fixed rows
 #  - can also be used to create scrolling rows of text, off-screen characters skipped quite efficiently
-#  - implemented separately so print_text() can be maximally efficient, line breaks not allowed
+#  - line breaks are not allowed (and rendered as unsupported character)
+#
+# lbl = textmode.Label(text)
+#  - precompiles a string into font code points once, for text that is displayed in every frame
+#  - rendering a label skips string conversion, character lookup and range checks
+#  - lbl.set(text) changes the text, reusing the label's buffer if it is large enough
+#
+# textmode.print_label(x, y, lbl, mode)
+#  - same as print_text(), but renders a precompiled Label object (line breaks allowed)
+#
+# textmode.scroll_label(x, y, lbl, mode)
+#  - same as scroll_text(), but renders a precompiled Label object
+#
+# textmode.print_int(x, y, value, width, mode, zero=False, left=False)
+#  - render integer value at text coordinates (x, y) in a field of width characters
+#  - width must be 1 .. 12 (raises ValueError otherwise)
+#  - writes digits directly into the framebuffer, without creating a string (no heap garbage)
+#  - right-aligned and padded with spaces by default, or padded with zeros if zero=True
+#  - left-aligned if left=True (padded with trailing spaces)
+#  - values that do not fit into the field are shown as ###
+#
+# textmode.print_fixed(x, y, value, decimals, width, mode, zero=False, left=False)
+#  - same as print_int() for fixed-point value / 10**decimals, e.g. value=425 with decimals=1 shows 42.5
+#
+# textmode.draw_text(x, y, text, mode)
+#  - render text with top left corner at arbitrary pixel position (x, y), e.g. for bouncing text
+#  - x and y may be negative or extend beyond the screen (clipped automatically)
+#  - line breaks are allowed: each further line starts one cell height lower at the same x position
+#  - each glyph byte is shifted once and split across two framebuffer rows, supporting all five modes;
+#    block, inverted and outline mode fill the full cell of each character
+#  - only slightly slower than print_text() (and identical to it if y is a multiple of 8)
+#
+# textmode.draw_label(x, y, lbl, mode)
+#  - same as draw_text(), but renders a precompiled Label object
+#
+# mq = textmode.Marquee(text, speed=1.0, gap=72, font=None)
+#  - long scrolling text: renders text once into a strip of pixel columns (glyph bytes and their
+#    outline), followed by gap empty columns; the strip wraps around, so the text repeats endlessly
+#  - speed: scrolling speed in px per frame (negative speed scrolls to the right)
+#  - font: font for the text (default: current font)
+#  - the text starts just right of the screen and scrolls in
+#  - mq.set(text) renders new text, reusing the strip if it is large enough
+#  - mq.clone(speed) returns a marquee with its own position and speed sharing the same strip
+#    (e.g. for several rows with the same text); set() on any of them changes the text of all
+#  - mq.move_to(x) places the first character at pixel position x
+#  - mq.update() advances the position by speed (once per frame)
+#  - mq.draw(y, mode) copies the visible 72 columns of the strip into framebuffer row y (0 .. 4)
+#    in any of the five modes; block, inverted and outline mode fill the full 8 px row of the
+#    text, while the gap columns are left unchanged (as with scroll_text())
+#  - unlike scroll_text(), drawing costs the same for any length of text, as no characters have
+#    to be skipped or looked up
+#
+# con = textmode.Console(font=None)
+#  - persistent character grid of font.cols x font.rows cells (default: current font), which stores the code point and drawing mode of every cell
+#  - con.draw() only redraws cells that have changed since they were last drawn, which is intended
+#    for log views and menus on a screen that is not cleared in every frame
+#  - mode 0 marks an empty cell that is never drawn (so other graphics can show through);
+#    if a glyph was shown in the cell before, it is erased to black
+#  - cells in block, inverted and outline mode are redrawn exactly; cells in overlay modes are
+#    blended with whatever is on screen, so call con.invalidate() after restoring the background
+#
+# con.print_text(x, y, text, mode), con.print_label(x, y, lbl, mode)
+# con.print_int(x, y, value, width, mode, zero=False, left=False)
+#  - write text, label or number into the grid (same arguments as corresponding module functions)
+#
+# con.clear(mode=0)
+#  - fill grid with spaces in given mode (default: empty cells)
+#
+# con.scroll_up(y1=0, y2=-1), con.scroll_down(y1=0, y2=-1)
+#  - scroll rows y1 .. y2 (default: last row) up or down by one line; a new line is filled with empty cells
+#  - with 8 px high fonts, the framebuffer contents of the rows are moved along, so unchanged glyphs are
+#    not re-rendered; otherwise con.draw() redraws the cells that differ from what is on screen
+#
+# con.log(text, mode)
+#  - scroll whole grid up and print text in the bottom row (for simple log views)
+#
+# con.draw()
+#  - render all cells that have changed
+#
+# con.invalidate()
+#  - force redraw of all cells in next con.draw(), e.g. after the screen has been cleared
+#
+# Internally, all text is converted into a buffer of code points first (for Label objects
+# this happens once). The renderers then select a specialised loop for the drawing mode once
+# per line of text rather than checking the mode for every byte. In block and inverted mode,
+# the framebuffer is not read at all and each line of characters is written as one
+# contiguous span of glyphs. The font's cell size and glyph tables are read into local
+# variables once per call, so the inner loops are the same for every font.
 
 import thumby
+import assets
+
+class Font:
+    def __init__(self, file: str, width: int, height: int):
+        if not 0 < height <= 8:
+            raise Exception("font height must be 1 .. 8 px")
+        self.file = file
+        self.width = width   # character cell size in px
+        self.height = height
+        self.cols = 72 // width  # size of text grid
+        self.rows = 40 // height
+        self.x0 = (72 - self.cols * width) // 2 # left margin of text grid in px
+        self.fg = None
+        self.bg = None
+        self.ready = False
 
-# bitmap data for 7x8 font: 64 codepoints with 7px x 8px each (= 7 bytes)
-font78_fg = bytearray([0,0,0,0,0,0,0,0,0,46,6,0,0,0,0,0,14,0,14,0,0,0,20,62,20,62,20,0,0,36,46,127,58,18,0,0,60,66,82,70,60,0,0,12,30,60,30,12,0,0,0,0,6,8,0,0,0,0,28,62,34,0,0,0,0,34,62,28,0,0,0,20,8,62,8,20,0,0,8,8,62,8,8,0,0,0,64,48,0,0,0,0,8,8,8,8,8,0,0,0,48,48,0,0,0,0,48,56,28,14,6,0,0,28,62,34,34,28,0,0,32,36,62,62,32,0,0,36,50,58,42,36,0,0,34,42,42,62,20,0,0,12,10,8,62,62,0,0,38,46,42,58,18,0,0,28,62,42,42,24,0,0,2,34,50,10,6,0,0,20,62,42,42,20,0,0,4,42,42,62,28,0,0,0,18,54,0,0,0,0,0,68,52,0,0,0,0,0,8,28,54,34,0,0,0,52,52,52,0,0,0,34,54,28,8,0,0,0,4,34,14,4,0,0,0,60,70,106,66,60,0,0,60,62,10,10,60,0,0,62,62,42,42,20,0,0,28,62,34,34,38,0,0,62,62,34,34,28,0,0,62,62,42,42,34,0,0,62,62,10,10,2,0,0,28,62,34,42,58,0,0,62,62,8,8,62,0,0,34,62,62,34,34,0,0,18,34,62,30,2,0,0,62,62,8,20,34,0,0,62,62,32,32,32,0,0,62,6,28,6,62,0,0,62,6,8,48,62,0,0,28,62,34,34,28,0,0,62,62,18,18,12,0,0,28,62,34,50,44,0,0,62,62,18,18,44,0,0,36,46,42,58,18,0,0,2,62,62,2,2,0,0,30,62,32,32,30,0,0,14,30,32,16,14,0,0,30,48,28,48,30,0,0,34,54,8,20,34,0,0,6,62,56,8,6,0,0,38,50,42,38,50,0,8,20,34,8,12,12,0,0,62,34,42,34,62,0,0,24,24,8,34,20,8,0,8,4,114,100,8,0,0,16,38,78,32,16,0])
-font78_bg = bytearray([0,0,0,0,0,0,0,0,127,127,127,15,0,0,0,31,31,31,31,31,0,62,127,127,127,127,127,62,118,127,255,255,255,127,55,126,255,255,255,255,255,126,30,63,127,127,127,63,30,0,0,15,31,31,28,0,0,62,127,127,127,119,0,0,119,127,127,127,62,0,62,62,127,127,127,62,62,28,28,127,127,127,28,28,0,224,248,248,120,0,0,28,28,28,28,28,28,28,0,120,120,120,120,0,0,120,124,126,127,63,31,15,63,127,127,127,127,127,62,112,126,127,127,127,127,112,126,127,127,127,127,127,126,127,127,127,127,127,127,62,30,31,31,127,127,127,127,127,127,127,127,127,127,63,62,127,127,127,127,127,62,7,119,127,127,127,31,15,62,127,127,127,127,127,62,14,127,127,127,127,127,62,0,63,127,127,127,0,0,0,238,254,254,126,0,0,0,28,62,127,127,127,119,0,126,126,126,126,126,0,119,127,127,127,62,28,0,14,127,127,127,31,14,0,126,255,255,255,255,255,126,126,127,127,127,127,127,126,127,127,127,127,127,127,62,62,127,127,127,127,127,127,127,127,127,127,127,127,62,127,127,127,127,127,127,119,127,127,127,127,31,31,7,62,127,127,127,127,127,127,127,127,127,127,127,127,127,119,127,127,127,127,119,119,63,127,127,127,127,63,7,127,127,127,127,127,127,119,127,127,127,127,112,112,112,127,127,127,63,127,127,127,127,127,127,127,127,127,127,62,127,127,127,127,127,62,127,127,127,127,63,63,30,62,127,127,127,127,127,126,127,127,127,127,127,127,126,126,127,127,127,127,127,63,7,127,127,127,127,7,7,63,127,127,127,127,127,63,31,63,127,127,127,63,31,63,127,127,126,127,127,63,119,127,127,127,127,127,119,15,127,127,127,127,31,15,127,127,127,127,127,127,127,62,127,127,127,30,30,30,127,127,127,127,127,127,127,60,60,60,127,127,127,62,28,30,255,255,255,254,28,56,127,255,255,255,120,56])
+    def load(self):
+        path = assets.find(self.file)
+        kind, width, height, count = assets.info(path)
+        if width != self.width or height != self.height or count < 64:
+            raise Exception(f"{path}: expected 64 glyphs of {self.width}x{self.height} px")
+        self.fg, self.bg = assets.load(path, assets.FONT)
+        self.ready = True
+
+# fonts: 64 codepoints each, loaded from asset files (see assets lib) when text is rendered for the first time
+font7x8 = Font("font7x8.tba", 7, 8) # 10 x 5 text grid
+font3x5 = Font("font3x5.tba", 4, 5) # 18 x 8 text grid
+_font = font7x8
+
+def set_font(font: Font):
+    global _font, _row_codes
+    _font = font
+    n = 72 // font.width + 2 # characters (partly) visible in a row of scroll_text()
+    if len(_row_codes) < n:
+        _row_codes = bytearray(n)
+
+def get_font() -> Font:
+    return _font
 
 block = const(1)
 outline = const(2)
@@ -41,75 +174,591 @@ inverted = const(3)
 overlay = const(4)
 overlay_outline = const(5)
 
+newline = const(255) # code point for line break
+
+_codes = bytearray(80) # scratch buffer for code points of print_text()
+_row_codes = bytearray(20) # scratch buffer for visible code points of scroll_text(), grown by set_font()
+
 @micropython.viper
-def print_text(x: int, y: int, text, mode: int):
-    buf = ptr8(thumby.display.display.buffer)
-    fg = ptr8(font78_fg)
-    bg = ptr8(font78_bg)
-    if not (0 <= y < 5):
-        return
-    x0 = x # remember initial x for linebreak
-    for char in text.upper():
-        if char == "\n":
-            x = x0
-            y += 1
-            if y >= 5:
-                return
+def _encode(text, buf, nl: int, skip: int) -> int:
+    # convert characters of text (after skipping the first skip) into code points, until buf is full
+    codes = ptr8(buf)
+    n_max = int(len(buf))
+    n = 0
+    for char in text:
+        if skip > 0:
+            skip -= 1
             continue
+        if n >= n_max:
+            break
         code = int(ord(char)) - 32
-        if not(0 <= code <= 63):
-            code = 60 # invalid codepoint
-        if not(0 <= x < 10):
-            continue
-        buf_offset = y * 72 + x * 7 + 1
-        font_offset = code * 7
-        for i in range(7):
-            fg_byte = fg[font_offset + i]
-            bg_byte = bg[font_offset + i]
-            buf_byte = buf[buf_offset + i]
-            if mode == block:
-                buf[buf_offset + i] = fg_byte
-            elif mode == outline:
-                buf[buf_offset + i] = bg_byte ^ fg_byte
-            elif mode == inverted:
-                buf[buf_offset + i] = 0xff ^ fg_byte
-            elif mode == overlay:
-                buf[buf_offset + i] = (buf_byte & (0xff ^ bg_byte)) | fg_byte
-            elif mode == overlay_outline:
-                buf[buf_offset + i] = (buf_byte | bg_byte) ^ fg_byte
-        x += 1
+        if 65 <= code <= 90:
+            code -= 32 # lowercase letters
+        elif not(0 <= code <= 63):
+            code = nl if code == -22 else 60 # line break or invalid codepoint
+        codes[n] = code
+        n += 1
+    return n
+
+def _scratch(text):
+    global _codes
+    if len(text) > len(_codes):
+        _codes = bytearray(len(text))
+    return _codes
 
 @micropython.viper
-def scroll_text(x: int, y: int, text, mode: int):
+def _print_codes(font, x: int, y: int, codes_buf, n: int, mode: int):
+    if not font.ready:
+        font.load()
+    cols = int(font.cols)
+    rows = int(font.rows)
+    if not (0 <= y < rows and 0 <= x < cols):
+        return # first line (and for x, every line) starts outside screen
+    w = int(font.width)
+    h = int(font.height)
+    if h != 8: # text rows are not aligned with framebuffer rows
+        _draw_codes(font, x * w + int(font.x0), y * h, codes_buf, n, mode)
+        return
     buf = ptr8(thumby.display.display.buffer)
-    fg = ptr8(font78_fg)
-    bg = ptr8(font78_bg)
-    if not(0 <= y < 5):
+    fg = ptr8(font.fg)
+    bg = ptr8(font.bg)
+    codes = ptr8(codes_buf)
+    x0 = int(font.x0)
+    j = 0
+    while j < n and y < rows:
+        e = j # end of current line
+        while e < n and codes[e] != newline:
+            e += 1
+        k_end = e if e - j <= cols - x else j + cols - x
+        dst = y * 72 + x * w + x0
+        if mode == block:
+            for k in range(j, k_end):
+                src = codes[k] * w
+                for i in range(w):
+                    buf[dst + i] = fg[src + i]
+                dst += w
+        elif mode == inverted:
+            for k in range(j, k_end):
+                src = codes[k] * w
+                for i in range(w):
+                    buf[dst + i] = 0xff ^ fg[src + i]
+                dst += w
+        elif mode == outline:
+            for k in range(j, k_end):
+                src = codes[k] * w
+                for i in range(w):
+                    buf[dst + i] = bg[src + i] ^ fg[src + i]
+                dst += w
+        elif mode == overlay:
+            for k in range(j, k_end):
+                src = codes[k] * w
+                for i in range(w):
+                    buf[dst + i] = (buf[dst + i] & (0xff ^ bg[src + i])) | fg[src + i]
+                dst += w
+        elif mode == overlay_outline:
+            for k in range(j, k_end):
+                src = codes[k] * w
+                for i in range(w):
+                    buf[dst + i] = (buf[dst + i] | bg[src + i]) ^ fg[src + i]
+                dst += w
+        j = e + 1
+        y += 1
+
+@micropython.viper
+def _scroll_codes(font, x: int, y: int, codes_buf, n: int, mode: int):
+    if not font.ready:
+        font.load()
+    if not(0 <= y < int(font.rows)):
         return
-    for char in text.upper():
-        if x >= 72:
-            break # all further characters are off-screen
-        if x <= -7:
-            x += 7 # character completely off-screen -> skip
-            continue
-        code = int(ord(char)) - 32
-        if not(0 <= code <= 63):
-            code = 60 # invalid codepoint
-        buf_offset = y * 72
-        font_offset = code * 7
-        for i in range(7):
-            if x >= 0 and x <= 71:
-                fg_byte = fg[font_offset + i]
-                bg_byte = bg[font_offset + i]
-                buf_byte = buf[buf_offset + x]
+    w = int(font.width)
+    h = int(font.height)
+    if h != 8:
+        _draw_codes(font, x, y * h, codes_buf, n, mode)
+        return
+    buf = ptr8(thumby.display.display.buffer)
+    fg = ptr8(font.fg)
+    bg = ptr8(font.bg)
+    codes = ptr8(codes_buf)
+    j = 0
+    if x <= 0 - w: # skip characters left of screen without looking at them
+        j = (0 - x) // w
+        x += w * j
+    if j >= n or x >= 72:
+        return
+    # visible characters j .. k_end - 1, only first and last may be clipped
+    k_end = (71 - x) // w + 1 + j
+    k_end = k_end if k_end < n else n
+    row = y * 72
+    for k in range(j, k_end):
+        code = codes[k]
+        src = (code if code <= 63 else 60) * w
+        c0 = 0 if x >= 0 else 0 - x
+        c1 = w if x <= 72 - w else 72 - x
+        dst = row + x
+        if mode == block:
+            for i in range(c0, c1):
+                buf[dst + i] = fg[src + i]
+        elif mode == inverted:
+            for i in range(c0, c1):
+                buf[dst + i] = 0xff ^ fg[src + i]
+        elif mode == outline:
+            for i in range(c0, c1):
+                buf[dst + i] = bg[src + i] ^ fg[src + i]
+        elif mode == overlay:
+            for i in range(c0, c1):
+                buf[dst + i] = (buf[dst + i] & (0xff ^ bg[src + i])) | fg[src + i]
+        elif mode == overlay_outline:
+            for i in range(c0, c1):
+                buf[dst + i] = (buf[dst + i] | bg[src + i]) ^ fg[src + i]
+        x += w
+
+_no_row = bytearray(72) # dummy framebuffer row for glyph halves outside screen
+
+@micropython.viper
+def _draw_codes(font, x: int, y: int, codes_buf, n: int, mode: int):
+    if not font.ready:
+        font.load()
+    w = int(font.width)
+    h = int(font.height)
+    fg = ptr8(font.fg)
+    bg = ptr8(font.bg)
+    codes = ptr8(codes_buf)
+    j = 0
+    while j < n and y < 40:
+        e = j # end of current line
+        while e < n and codes[e] != newline:
+            e += 1
+        if y > 0 - h and x < 72:
+            row = y >> 3
+            shift = y & 0x07
+            # glyph bytes are split into upper part (in row) and lower part (in row + 1)
+            if 0 <= row:
+                up = ptr8(thumby.display.display.buffer)
+                up_off = row * 72
+            else:
+                up = ptr8(_no_row)
+                up_off = 0
+            if row + 1 < 5 and shift + h > 8:
+                lo = ptr8(thumby.display.display.buffer)
+                lo_off = (row + 1) * 72
+            else:
+                lo = ptr8(_no_row)
+                lo_off = 0
+            m = ((1 << h) - 1) << shift # pixels covered by character cell
+            keep_up = 0xff ^ (m & 0xff)
+            keep_lo = 0xff ^ (m >> 8)
+            k = j
+            px = x
+            if px <= 0 - w: # skip characters left of screen
+                k += (0 - px) // w
+                px += w * ((0 - px) // w)
+            while k < e and px < 72:
+                src = codes[k] * w - px # so that src + (px + i) points to glyph column i
+                c0 = px if px >= 0 else 0
+                c1 = px + w if px <= 72 - w else 72
+                u = up_off
+                l = lo_off
                 if mode == block:
-                    buf[buf_offset + x] = fg_byte
-                elif mode == outline:
-                    buf[buf_offset + x] = bg_byte ^ fg_byte
+                    for i in range(c0, c1):
+                        v = fg[src + i] << shift
+                        up[u + i] = (up[u + i] & keep_up) | (v & 0xff)
+                        lo[l + i] = (lo[l + i] & keep_lo) | (v >> 8)
                 elif mode == inverted:
-                    buf[buf_offset + x] = 0xff ^ fg_byte
+                    for i in range(c0, c1):
+                        v = m ^ (fg[src + i] << shift)
+                        up[u + i] = (up[u + i] & keep_up) | (v & 0xff)
+                        lo[l + i] = (lo[l + i] & keep_lo) | (v >> 8)
+                elif mode == outline:
+                    for i in range(c0, c1):
+                        v = (bg[src + i] ^ fg[src + i]) << shift
+                        up[u + i] = (up[u + i] & keep_up) | (v & 0xff)
+                        lo[l + i] = (lo[l + i] & keep_lo) | (v >> 8)
                 elif mode == overlay:
-                    buf[buf_offset + x] = (buf_byte & (0xff ^ bg_byte)) | fg_byte
+                    for i in range(c0, c1):
+                        v = fg[src + i] << shift
+                        b = bg[src + i] << shift
+                        up[u + i] = (up[u + i] & (0xff ^ (b & 0xff))) | (v & 0xff)
+                        lo[l + i] = (lo[l + i] & (0xff ^ (b >> 8))) | (v >> 8)
                 elif mode == overlay_outline:
-                    buf[buf_offset + x] = (buf_byte | bg_byte) ^ fg_byte
+                    for i in range(c0, c1):
+                        v = fg[src + i] << shift
+                        b = bg[src + i] << shift
+                        up[u + i] = (up[u + i] | (b & 0xff)) ^ (v & 0xff)
+                        lo[l + i] = (lo[l + i] | (b >> 8)) ^ (v >> 8)
+                k += 1
+                px += w
+        j = e + 1
+        y += h
+
+@micropython.native
+def print_text(x: int, y: int, text, mode: int):
+    font = _font
+    if 0 <= y < font.rows and 0 <= x < font.cols:
+        codes = _scratch(text)
+        _print_codes(font, x, y, codes, _encode(text, codes, newline, 0), mode)
+
+@micropython.native
+def scroll_text(x: int, y: int, text, mode: int):
+    font = _font
+    w = int(font.width)
+    if 0 <= y < font.rows and x < 72:
+        skip = 0 if x > -w else (0 - x) // w # only convert characters that are (partly) visible
+        n = _encode(text, _row_codes, 60, skip)
+        _scroll_codes(font, x + w * skip, y, _row_codes, n, mode)
+
+class Label:
+    def __init__(self, text: str):
+        self.codes = bytearray(len(text))
+        self.set(text)
+
+    def set(self, text: str):
+        if len(text) > len(self.codes):
+            self.codes = bytearray(len(text))
+        self.n = _encode(text, self.codes, newline, 0)
+
+@micropython.native
+def print_label(x: int, y: int, label, mode: int):
+    _print_codes(_font, x, y, label.codes, label.n, mode)
+
+@micropython.native
+def scroll_label(x: int, y: int, label, mode: int):
+    _scroll_codes(_font, x, y, label.codes, label.n, mode)
+
+@micropython.native
+def draw_text(x: int, y: int, text, mode: int):
+    codes = _scratch(text)
+    _draw_codes(_font, x, y, codes, _encode(text, codes, newline, 0), mode)
+
+@micropython.native
+def draw_label(x: int, y: int, label, mode: int):
+    _draw_codes(_font, x, y, label.codes, label.n, mode)
+
+@micropython.viper
+def _render_strip(font, codes_buf, n: int, fg_buf, bg_buf):
+    w = int(font.width)
+    fg = ptr8(font.fg)
+    bg = ptr8(font.bg)
+    codes = ptr8(codes_buf)
+    sfg = ptr8(fg_buf)
+    sbg = ptr8(bg_buf)
+    for i in range(int(len(fg_buf))):
+        sfg[i] = 0
+        sbg[i] = 0
+    dst = 0
+    for k in range(n):
+        src = codes[k] * w
+        for i in range(w):
+            sfg[dst + i] = fg[src + i]
+            sbg[dst + i] = bg[src + i]
+        dst += w
+
+class _Strip:
+    def __init__(self):
+        self.fg = bytearray(0) # glyph bytes, one per pixel column
+        self.bg = bytearray(0) # outline bytes
+        self.length = 1   # columns of text and gap (at least 1)
+        self.n_text = 0   # columns of text, the following gap columns are not drawn
+
+class Marquee:
+    def __init__(self, text: str, speed: float = 1.0, gap: int = 72, font: Font = None, strip: _Strip = None):
+        self.font = font if font else _font
+        self.gap = gap
+        self.speed = int(speed * 256) # in 1/256 px per frame
+        self.strip = strip if strip else _Strip()
+        if strip:
+            self.move_to(72)
+        else:
+            self.set(text)
+
+    def set(self, text: str):
+        font = self.font
+        if not font.ready:
+            font.load()
+        strip = self.strip
+        n_text = len(text) * font.width
+        length = n_text + self.gap
+        length = length if length > 0 else 1 # keep one blank column for empty text without gap
+        if length > len(strip.fg):
+            strip.fg = bytearray(length)
+            strip.bg = bytearray(length)
+        strip.length = length
+        strip.n_text = n_text
+        codes = _scratch(text)
+        _render_strip(font, codes, _encode(text, codes, 60, 0), strip.fg, strip.bg)
+        self.move_to(72)
+
+    def clone(self, speed: float):
+        return Marquee("", speed, self.gap, self.font, self.strip)
+
+    def move_to(self, x: int):
+        self.pos = ((0 - x) % self.strip.length) << 8 # strip column at left screen edge, in 1/256 px
+
+    @micropython.native
+    def update(self):
+        pos = self.pos + self.speed
+        end = self.strip.length << 8
+        while pos >= end:
+            pos -= end
+        while pos < 0:
+            pos += end
+        self.pos = pos
+
+    @micropython.viper
+    def draw(self, y: int, mode: int):
+        if not (0 <= y < 5):
+            return
+        buf = ptr8(thumby.display.display.buffer)
+        strip = self.strip
+        fg = ptr8(strip.fg)
+        bg = ptr8(strip.bg)
+        length = int(strip.length)
+        n_text = int(strip.n_text)
+        s = (int(self.pos) >> 8) % length # position may be beyond end after set() with shorter text
+        dst = y * 72
+        x = 0
+        while x < 72: # copy strip in segments up to its end, then wrap around
+            n = length - s
+            n = n if n <= 72 - x else 72 - x
+            d = dst + x - s # so that d + (s + i) points to screen column x + i
+            e = s + n if s + n <= n_text else n_text # gap columns are left unchanged
+            if mode == block:
+                for i in range(s, e):
+                    buf[d + i] = fg[i]
+            elif mode == inverted:
+                for i in range(s, e):
+                    buf[d + i] = 0xff ^ fg[i]
+            elif mode == outline:
+                for i in range(s, e):
+                    buf[d + i] = bg[i] ^ fg[i]
+            elif mode == overlay:
+                for i in range(s, e):
+                    buf[d + i] = (buf[d + i] & (0xff ^ bg[i])) | fg[i]
+            elif mode == overlay_outline:
+                for i in range(s, e):
+                    buf[d + i] = (buf[d + i] | bg[i]) ^ fg[i]
+            x += n
+            s = 0
+
+_num_codes = bytearray(28) # formatted number in [0:12], work area in [12:28]
+
+@micropython.viper
+def _format(value: int, decimals: int, width: int, zero: bool, left: bool) -> int:
+    if width < 1 or width > 12:
+        raise ValueError("width must be 1 .. 12")
+    codes = ptr8(_num_codes)
+    neg = value < 0
+    v = 0 - value if neg else value
+    p = 28 # write digits backwards from end of work area
+    d = 0
+    while v > 0 or d <= decimals:
+        if p <= 15:
+            p = 0 # more than 12 characters, will be shown as ###
+            break
+        if d == decimals and decimals > 0:
+            p -= 1
+            codes[p] = 14 # .
+        p -= 1
+        codes[p] = 16 + v % 10 # digit
+        v //= 10
+        d += 1
+    if zero and not left and p > 0:
+        n_zero = width - (28 - p) - (1 if neg else 0)
+        for i in range(n_zero):
+            p -= 1
+            codes[p] = 16 # 0
+    if neg and p > 0:
+        p -= 1
+        codes[p] = 13 # -
+    n = 28 - p
+    if n > width:
+        for i in range(width):
+            codes[i] = 3 # #
+        return width
+    pad = 0 if left else width - n
+    for i in range(pad):
+        codes[i] = 0
+    for i in range(n):
+        codes[pad + i] = codes[p + i]
+    for i in range(pad + n, width):
+        codes[i] = 0
+    return width
+
+@micropython.native
+def print_int(x: int, y: int, value: int, width: int, mode: int, zero: bool = False, left: bool = False):
+    _print_codes(_font, x, y, _num_codes, _format(value, 0, width, zero, left), mode)
+
+@micropython.native
+def print_fixed(x: int, y: int, value: int, decimals: int, width: int, mode: int, zero: bool = False, left: bool = False):
+    _print_codes(_font, x, y, _num_codes, _format(value, decimals, width, zero, left), mode)
+
+class Console:
+    def __init__(self, font: Font = None):
+        self.font = font if font else _font
+        self.cols = self.font.cols
+        self.rows = self.font.rows
+        n = self.cols * self.rows
+        self.codes = bytearray(n)       # grid of code points
+        self.modes = bytearray(n)       # and drawing modes (0 = empty)
+        self.shown_codes = bytearray(n) # what is currently shown on screen
+        self.shown_modes = bytearray(n)
+        self._cell = bytearray(1)       # code point of single cell for unaligned fonts
+        self.clear()
+        self.invalidate()
+
+    @micropython.viper
+    def _put(self, x: int, y: int, codes_buf, n: int, mode: int):
+        codes = ptr8(self.codes)
+        modes = ptr8(self.modes)
+        cols = int(self.cols)
+        rows = int(self.rows)
+        src = ptr8(codes_buf)
+        x0 = x
+        for j in range(n):
+            code = src[j]
+            if code == newline:
+                x = x0
+                y += 1
+                continue
+            if 0 <= x < cols and 0 <= y < rows:
+                codes[y * cols + x] = code
+                modes[y * cols + x] = mode
             x += 1
+
+    def print_text(self, x: int, y: int, text, mode: int):
+        codes = _scratch(text)
+        self._put(x, y, codes, _encode(text, codes, newline, 0), mode)
+
+    def print_label(self, x: int, y: int, label, mode: int):
+        self._put(x, y, label.codes, label.n, mode)
+
+    def print_int(self, x: int, y: int, value: int, width: int, mode: int, zero: bool = False, left: bool = False):
+        self._put(x, y, _num_codes, _format(value, 0, width, zero, left), mode)
+
+    def clear(self, mode: int = 0):
+        for i in range(len(self.codes)):
+            self.codes[i] = 0
+            self.modes[i] = mode
+
+    def invalidate(self):
+        for i in range(len(self.codes)):
+            self.shown_modes[i] = 0xff # no valid mode, so every cell will be redrawn
+
+    @micropython.viper
+    def _scroll(self, y1: int, y2: int, up: bool):
+        cols = int(self.cols)
+        rows = int(self.rows)
+        y1 = y1 if y1 >= 0 else 0
+        y2 = y2 if y2 < rows else rows - 1
+        if y2 <= y1:
+            if y2 == y1: # single row: just clear it
+                self._clear_row(y1)
+            return
+        buf = ptr8(thumby.display.display.buffer)
+        codes = ptr8(self.codes)
+        modes = ptr8(self.modes)
+        shown_codes = ptr8(self.shown_codes)
+        shown_modes = ptr8(self.shown_modes)
+        font = self.font
+        # rendered glyphs can only be moved along with the grid if text rows are framebuffer rows,
+        # otherwise the shown grid stays with the screen and draw() redraws cells that differ
+        aligned = int(font.height) == 8
+        x0 = int(font.x0)
+        x1 = x0 + cols * int(font.width)
+        if up:
+            y_from = y1 + 1
+            y_to = y1
+            y_new = y2
+            step = 1
+        else:
+            y_from = y2 - 1
+            y_to = y2
+            y_new = y1
+            step = -1
+        for _ in range(y2 - y1):
+            for i in range(cols):
+                codes[y_to * cols + i] = codes[y_from * cols + i]
+                modes[y_to * cols + i] = modes[y_from * cols + i]
+            if aligned:
+                for i in range(cols):
+                    shown_codes[y_to * cols + i] = shown_codes[y_from * cols + i]
+                    shown_modes[y_to * cols + i] = shown_modes[y_from * cols + i]
+                for i in range(x0, x1): # move rendered glyphs along with grid
+                    buf[y_to * 72 + i] = buf[y_from * 72 + i]
+            y_from += step
+            y_to += step
+        self._clear_row(y_new)
+
+    @micropython.viper
+    def _clear_row(self, y: int):
+        codes = ptr8(self.codes)
+        modes = ptr8(self.modes)
+        cols = int(self.cols)
+        for i in range(y * cols, y * cols + cols):
+            codes[i] = 0
+            modes[i] = 0
+
+    def scroll_up(self, y1: int = 0, y2: int = -1):
+        self._scroll(y1, y2 if y2 >= 0 else self.rows - 1, True)
+
+    def scroll_down(self, y1: int = 0, y2: int = -1):
+        self._scroll(y1, y2 if y2 >= 0 else self.rows - 1, False)
+
+    def log(self, text, mode: int):
+        self._scroll(0, self.rows - 1, True)
+        self.print_text(0, self.rows - 1, text, mode)
+
+    @micropython.viper
+    def draw(self):
+        font = self.font
+        if not font.ready:
+            font.load()
+        buf = ptr8(thumby.display.display.buffer)
+        fg = ptr8(font.fg)
+        bg = ptr8(font.bg)
+        w = int(font.width)
+        h = int(font.height)
+        x0 = int(font.x0)
+        cols = int(self.cols)
+        codes = ptr8(self.codes)
+        modes = ptr8(self.modes)
+        shown_codes = ptr8(self.shown_codes)
+        shown_modes = ptr8(self.shown_modes)
+        cell = ptr8(self._cell)
+        for c in range(int(len(self.codes))):
+            code = codes[c]
+            mode = modes[c]
+            prev_mode = shown_modes[c]
+            if code == shown_codes[c] and mode == prev_mode:
+                continue
+            shown_codes[c] = code
+            shown_modes[c] = mode
+            if h != 8: # unaligned text rows: render cell with shifted glyph bytes
+                if mode == 0:
+                    if not (1 <= prev_mode <= 5):
+                        continue
+                    code = 0 # erase glyph drawn before by drawing a space
+                    mode = block
+                cell[0] = code
+                _draw_codes(font, (c % cols) * w + x0, (c // cols) * h, self._cell, 1, mode)
+                continue
+            dst = (c // cols) * 72 + (c % cols) * w + x0
+            src = code * w
+            if mode == 0:
+                if 1 <= prev_mode <= 5: # erase glyph drawn before
+                    for i in range(w):
+                        buf[dst + i] = 0
+            elif mode == block:
+                for i in range(w):
+                    buf[dst + i] = fg[src + i]
+            elif mode == inverted:
+                for i in range(w):
+                    buf[dst + i] = 0xff ^ fg[src + i]
+            elif mode == outline:
+                for i in range(w):
+                    buf[dst + i] = bg[src + i] ^ fg[src + i]
+            elif mode == overlay:
+                for i in range(w):
+                    buf[dst + i] = (buf[dst + i] & (0xff ^ bg[src + i])) | fg[src + i]
+            elif mode == overlay_outline:
+                for i in range(w):
+                    buf[dst + i] = (buf[dst + i] | bg[src + i]) ^ fg[src + i]
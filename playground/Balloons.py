@@ -6,49 +6,41 @@ import shapes
 import textmode
 from fps import FPS
 
-balloon_fg = bytearray([0,240,152,12,228,246,254,254,254,252,252,248,224,0,0,3,15,31,63,127,255,191,223,103,59,12,7,0,0,0,0,0,0,12,147,97,0,0,0,0,0,0])
-balloon_mask = bytearray([240,248,252,254,254,255,255,255,255,254,254,252,248,224,3,15,31,63,127,255,255,255,255,255,127,63,15,7,0,0,0,0,12,31,191,115,1,0,0,0,0,0])
-
-balloon_spr = sprites.Sprite(14, 24, balloon_fg, balloon_mask)
+balloon_spr = sprites.load("balloon.tba")[0] # 14 x 24 px
+balloon_spr.preshift() # drawn up to 42 times per frame
 
 max_sprites = 42
-balloons = [sprites.SpriteObj(frames=[balloon_spr], visible=False) for _ in range(max_sprites)]
+balloons = sprites.SpriteGroup([balloon_spr], max_sprites)
+balloons.cull(sprites.cull_left | sprites.cull_right | sprites.cull_top) # new balloons start below screen
 
-def random_init(obj: sprites.SpriteObj):
+def spawn_balloon():
     x = random.uniform(-8.0, 64.0)
     y = random.uniform(40.0, 60.0)
-    obj.move(x, y)
     vy = random.uniform(-40.0, -10.0)
     vx = random.uniform(-15.0, 15.0)
-    obj.speed(vx, vy)
-    obj.accel(0.0, -5.0)
-    obj.friction(0.5, 0.0)
-    obj.visible(True)
+    balloons.spawn(x, y, vx, vy, 0.0, -5.0, 0.5, 0.0)
 
 fps = FPS()
+per_second = textmode.Label("/s")
+n_equals = textmode.Label("n=")
 thumby.display.setFPS(0)
 fps.tock()
 
 invert = False  # toggle inverse display with A button
 wind = 0.0      # additional horizontal acceleration from wind (with L, R buttons)
-n_sprites = 13  # number of sprites rendered (adjust with U, D buttons)
 
-for i in range(n_sprites):
-    random_init(balloons[i])
-    balloons[i].update(0)
+for i in range(13): # initial number of balloons (adjust with U, D buttons)
+    spawn_balloon()
 
 while not thumby.buttonB.pressed():
     dt = fps.frame_time()
     fps.tick()
 
     if thumby.buttonU.justPressed():
-        if n_sprites < max_sprites:
-            n_sprites += 1
-            random_init(balloons[n_sprites - 1])
+        spawn_balloon() # ignored if all balloons are in use
     elif thumby.buttonD.justPressed():
-        if n_sprites > 1:
-            balloons[n_sprites - 1].visible(False)
-            n_sprites -= 1
+        if balloons.n_live > 1:
+            balloons.despawn(balloons.live[balloons.n_live - 1])
     elif thumby.buttonA.justPressed():
         invert = not invert
 
@@ -68,20 +60,21 @@ while not thumby.buttonB.pressed():
         for y in range(5, 40, 10):
             shapes.hline(y, 0, 71, shapes.fill)
 
-    for i in range(n_sprites):
-        out_x, out_y = balloons[i].onscreen()
-        if out_x or out_y < 0:
-            random_init(balloons[i])
-        balloons[i].update(dt, ax=wind)
-        balloons[i].draw(invert)
+    n_out = balloons.update(dt, ax=wind)
+    for k in range(n_out): # recycle balloons that left the screen
+        balloons.despawn(balloons.culled[k])
+        spawn_balloon()
+    balloons.draw(invert)
 
     cur_fps = fps.fps()
     if fps.tock_time() < 4:
         textmode.print_text(0, 0, 
             "^ more\n_ fewer\n[] wind\n@ invert\n% exit", textmode.block)
     else:
-        textmode.print_text(0, 0, f"n={n_sprites}", textmode.overlay)
-        textmode.print_text(3, 4, f"{cur_fps:5.1f}/s", textmode.overlay)
+        textmode.print_label(0, 0, n_equals, textmode.overlay)
+        textmode.print_int(2, 0, balloons.n_live, 2, textmode.overlay, left=True)
+        textmode.print_fixed(3, 4, int(cur_fps * 10.0 + 0.5), 1, 5, textmode.overlay)
+        textmode.print_label(8, 4, per_second, textmode.overlay)
 
     thumby.display.update()
 
@@ -5,6 +5,7 @@ import textmode
 from fps import FPS
 
 fps = FPS()
+per_second = textmode.Label("/s")
 thumby.display.setFPS(0)
 fps.tock()
 
@@ -138,7 +139,8 @@ while not thumby.buttonB.pressed():
             textmode.print_text(0, 0, 
                 "1=shapes\n\n^ drawmode\n_ shape\n[]speed", textmode.block)
         else:
-            textmode.print_text(3, 4, f"{cur_fps:5.1f}/s", textmode.overlay)
+            textmode.print_fixed(3, 4, int(cur_fps * 10.0 + 0.5), 1, 5, textmode.overlay)
+            textmode.print_label(8, 4, per_second, textmode.overlay)
 
     elif page == 2:
         if thumby.buttonU.pressed():
@@ -164,7 +166,8 @@ while not thumby.buttonB.pressed():
             textmode.print_text(0, 0, 
                 "2=twister\n\n^ tighten\n_ loosen\n[]speed", textmode.block)
         else:
-            textmode.print_text(3, 4, f"{cur_fps:5.1f}/s", textmode.overlay)
+            textmode.print_fixed(3, 4, int(cur_fps * 10.0 + 0.5), 1, 5, textmode.overlay)
+            textmode.print_label(8, 4, per_second, textmode.overlay)
     
     elif page == 3:
         if thumby.buttonL.pressed():
@@ -207,7 +210,8 @@ while not thumby.buttonB.pressed():
             textmode.print_text(0, 0, 
                 "3=parallax\n\n\n^_ up/down\n[]speed", textmode.block)
         else:
-            textmode.print_text(3, 4, f"{cur_fps:5.1f}/s", textmode.overlay)
+            textmode.print_fixed(3, 4, int(cur_fps * 10.0 + 0.5), 1, 5, textmode.overlay)
+            textmode.print_label(8, 4, per_second, textmode.overlay)
 
     elif page == 4:
         if thumby.buttonU.pressed():
@@ -243,7 +247,8 @@ while not thumby.buttonB.pressed():
             textmode.print_text(0, 0, 
                 "4=polygons\n\n^ more\n_ fewer\n[]speed", textmode.block)
         else:
-            textmode.print_text(3, 4, f"{cur_fps:5.1f}/s", textmode.overlay)
+            textmode.print_fixed(3, 4, int(cur_fps * 10.0 + 0.5), 1, 5, textmode.overlay)
+            textmode.print_label(8, 4, per_second, textmode.overlay)
 
 
     else:
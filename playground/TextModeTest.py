@@ -4,6 +4,7 @@ import shapes
 from fps import FPS
 
 fps = FPS()
+per_second = textmode.Label("/s")
 thumby.display.setFPS(10)
 
 while fps.time() < 3.0:
@@ -46,9 +47,9 @@ lines = [
 shift = 0
 
 scrolltext = "&&& See how nicely 'textmode' renders [ scrolling [ text [ rows [ !!!"
-scroll_min_x = -7 * len(scrolltext)
-scroll_x = [72.0] * 5
 scroll_speed = [0.2, 0.1, 0.6, 1.0, 0.4]
+marquee = textmode.Marquee(scrolltext, scroll_speed[0])
+marquees = [marquee] + [marquee.clone(speed) for speed in scroll_speed[1:]]
 
 while not thumby.buttonB.justPressed():
     if thumby.buttonA.justPressed():
@@ -94,16 +95,15 @@ while not thumby.buttonB.justPressed():
             else:
                 thumby.display.drawFilledRectangle(12, 8, 60 - 12, 32 - 8, 1)
         for i in range(5):
-            scroll_x[i] -= scroll_speed[i]
-            if scroll_x[i] < scroll_min_x:
-                scroll_x[i] = 72.0
-            textmode.scroll_text(int(scroll_x[i]), i, scrolltext, dpy_mode)
+            marquees[i].update()
+            marquees[i].draw(i, dpy_mode)
     else:
         raise BaseException("NYI")
 
     fps.tick()
     cur_fps = fps.fps()
     if screen != 1:
-        textmode.print_text(3, 4, f"{cur_fps:5.1f}/s", textmode.overlay)
+        textmode.print_fixed(3, 4, int(cur_fps * 10.0 + 0.5), 1, 5, textmode.overlay)
+        textmode.print_label(8, 4, per_second, textmode.overlay)
 
     thumby.display.update()
@@ -0,0 +1,222 @@
+# MKASSET converts the images in assets/ into binary asset files (.tba) that can be loaded
+# efficiently on the Thumby with the `assets` lib (see lib/assets.py for the file format).
+# It runs on the host and only needs the Python standard library.
+#
+# Images use three colours: white pixels are part of the bitmap (and its mask), grey pixels
+# are part of the mask only (e.g. a black outline around a sprite) and black pixels are
+# transparent. For fonts, the bitmap becomes the foreground and the mask the background
+# (outline) plane used by textmode.
+#
+# python3 tools/mkasset.py font IMAGE OUT [--cell 7x8] [--count 64]
+#  - glyphs are arranged in a grid of cells (left to right, top to bottom)
+#  - see mkfont.py for fonts drawn as text files or with automatically derived outlines
+#
+# python3 tools/mkasset.py sprite SOURCE OUT [--frames N] [--packed] [--size WxH]
+#  - SOURCE is a PNG image containing N animation frames of equal width side by side, or a
+#    Python file with bytearray([...]) literals as exported by the web editor: the first one
+#    holds the bitmap of all frames one after the other, the optional second one the mask
+#    (without mask, sprites are opaque); --size WxH of a frame is required for such sources
+#  - --packed: write frames as 32-bit column words (two per column for frames taller than
+#    32 px, see assets lib), which the sprites lib loads without any repacking
+#
+# python3 tools/mkasset.py variants SOURCE OUT [--angles 16] [--scales 1.0,...] [--size WxH]
+#  - render rotated and scaled variants of the first frame of a sprite SOURCE (as for the
+#    sprite command) ahead of time and write them as packed asset file, which can be passed
+#    to sprites.Variants after loading it with sprites.load(); uses the same sampling as
+#    sprites.Variants, which renders them on the device otherwise
+#
+# python3 tools/mkasset.py dump FILE
+#  - print header of an asset file and its planes as Python bytearray literals
+
+import argparse
+import math
+import os
+import re
+import struct
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import pngread
+
+VERSION = 1
+
+def header(kind, width, height, count):
+    return b"TB" + kind.encode() + bytes([VERSION, width, height]) + struct.pack("<H", count)
+
+def pack_planes(grid, x0, y0, width, height):
+    # bitmap and mask bytes in display layout for the rectangle at (x0, y0)
+    h_bytes = (height + 7) // 8
+    bitmap = bytearray(width * h_bytes)
+    mask = bytearray(width * h_bytes)
+    for y in range(height):
+        for x in range(width):
+            v = grid[y0 + y][x0 + x]
+            i = (y >> 3) * width + x
+            if v == 2:
+                bitmap[i] |= 1 << (y & 7)
+            if v >= 1:
+                mask[i] |= 1 << (y & 7)
+    return bitmap, mask
+
+def write(path, kind, width, height, frames):
+    with open(path, "wb") as fh:
+        fh.write(header(kind, width, height, len(frames)))
+        fh.write(b"".join(b for b, m in frames))
+        fh.write(b"".join(m for b, m in frames))
+
+def make_font(image, out, cell, count):
+    cw, ch = cell
+    width, height, rows = pngread.read(image)
+    grid = pngread.classify(rows)
+    cols = width // cw
+    if count > cols * (height // ch):
+        raise Exception(f"{image} contains fewer than {count} glyphs of size {cw}x{ch}")
+    glyphs = [pack_planes(grid, (i % cols) * cw, (i // cols) * ch, cw, ch) for i in range(count)]
+    write(out, "F", cw, ch, glyphs)
+
+def pack_words(plane, width, height):
+    # one 32-bit little-endian word per column of a plane in display layout, followed by a
+    # second word per column for rows 32 .. 39 of frames taller than 32 px
+    h_bytes = (height + 7) // 8
+    cols = [sum(plane[y * width + x] << (8 * y) for y in range(h_bytes)) for x in range(width)]
+    words = [v & 0xffffffff for v in cols]
+    if height > 32:
+        words += [v >> 32 for v in cols]
+    return struct.pack(f"<{len(words)}I", *words)
+
+def read_bytearrays(source, n_frames, size):
+    if size is None:
+        raise Exception(f"--size is required for {source}")
+    fw, height = size
+    with open(source) as fh:
+        arrays = [bytes(int(v, 0) for v in re.findall(r"\w+", body))
+                  for body in re.findall(r"bytearray\(\s*\[([^\]]*)\]\s*\)", fh.read())]
+    if not arrays:
+        raise Exception(f"{source} contains no bytearray literals")
+    frame_size = fw * ((height + 7) // 8)
+    bitmap = arrays[0]
+    if len(arrays) > 1:
+        mask = arrays[1]
+    else: # opaque sprite: mask covers all pixels of each column
+        col = (1 << height) - 1
+        mask = bytes(((col >> (8 * (i // fw))) & 0xff) for i in range(frame_size)) * n_frames
+    if len(bitmap) != n_frames * frame_size or len(mask) != len(bitmap):
+        raise Exception(f"{source}: expected {n_frames * frame_size} bytes for {n_frames} frames of {fw}x{height}")
+    return fw, height, [(bitmap[i * frame_size:(i + 1) * frame_size], mask[i * frame_size:(i + 1) * frame_size])
+                        for i in range(n_frames)]
+
+def make_sprite(source, out, n_frames, packed=False, size=None):
+    if source.lower().endswith(".png"):
+        width, height, rows = pngread.read(source)
+        grid = pngread.classify(rows)
+        if width % n_frames:
+            raise Exception(f"width of {source} is not a multiple of {n_frames} frames")
+        fw = width // n_frames
+        frames = [pack_planes(grid, i * fw, 0, fw, height) for i in range(n_frames)]
+    else:
+        fw, height, frames = read_bytearrays(source, n_frames, size)
+    if packed:
+        if height > 40:
+            raise Exception("sprites can be at most 40 px high")
+        frames = [(pack_words(b, fw, height), pack_words(m, fw, height)) for b, m in frames]
+    write(out, "P" if packed else "S", fw, height, frames)
+
+def read_frames(source, n_frames, size):
+    # frames of a sprite source as grids of pixel classes (2 = bitmap, 1 = mask only)
+    if source.lower().endswith(".png"):
+        width, height, rows = pngread.read(source)
+        grid = pngread.classify(rows)
+        fw = width // n_frames
+        return fw, height, [[row[i * fw:(i + 1) * fw] for row in grid] for i in range(n_frames)]
+    fw, height, frames = read_bytearrays(source, n_frames, size)
+    def value(plane, x, y):
+        return (plane[(y >> 3) * fw + x] >> (y & 7)) & 1
+    return fw, height, [[[2 if value(b, x, y) else value(m, x, y) for x in range(fw)] for y in range(height)]
+                        for b, m in frames]
+
+def rotate(grid, width, height, size, angle, scale):
+    # same nearest neighbour sampling as sprites.Variants
+    phi = 2.0 * math.pi * angle
+    c = round(math.cos(phi), 9) / scale
+    s = round(math.sin(phi), 9) / scale
+    out = [[0] * size for _ in range(size)]
+    for x in range(size):
+        u = x + 0.5 - size / 2.0
+        for y in range(size):
+            v = y + 0.5 - size / 2.0
+            sx = math.floor(c * u - s * v + width / 2.0)
+            sy = math.floor(s * u + c * v + height / 2.0)
+            if 0 <= sx < width and 0 <= sy < height:
+                out[y][x] = grid[sy][sx]
+    return out
+
+def make_variants(source, out, n_angles, scales, size=None):
+    width, height, frames = read_frames(source, 1, size)
+    side = math.ceil(math.sqrt(width ** 2 + height ** 2) * max(scales))
+    if side > 40:
+        raise Exception(f"rotated sprite needs {side} x {side} px, at most 40 px are possible")
+    variants = []
+    for scale in scales:
+        for a in range(n_angles):
+            planes = pack_planes(rotate(frames[0], width, height, side, a / n_angles, scale), 0, 0, side, side)
+            variants.append((pack_words(planes[0], side, side), pack_words(planes[1], side, side)))
+    write(out, "P", side, side, variants)
+
+def dump(path):
+    with open(path, "rb") as fh:
+        data = fh.read()
+    kind, version, width, height = chr(data[2]), data[3], data[4], data[5]
+    count = struct.unpack("<H", data[6:8])[0]
+    print(f"# {path}: kind={kind} version={version} {width}x{height} count={count}")
+    if kind == "P":
+        n = count * width * (2 if height > 32 else 1)
+        size = n * 4
+        bitmap = struct.unpack(f"<{n}I", data[8:8 + size])
+        mask = struct.unpack(f"<{n}I", data[8 + size:8 + 2 * size])
+        print("bitmap = array('I', [" + ",".join(hex(w) for w in bitmap) + "])")
+        print("mask = array('I', [" + ",".join(hex(w) for w in mask) + "])")
+        return
+    size = count * width * ((height + 7) // 8)
+    print(f"bitmap = bytearray({list(data[8:8 + size])})".replace(" ", ""))
+    print(f"mask = bytearray({list(data[8 + size:8 + 2 * size])})".replace(" ", ""))
+
+def size(s):
+    w, h = s.lower().split("x")
+    return int(w), int(h)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="convert PNG images into Thumby asset files")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("font", help="convert font image")
+    p.add_argument("image")
+    p.add_argument("out")
+    p.add_argument("--cell", type=size, default=(7, 8), help="glyph cell size WxH (default 7x8)")
+    p.add_argument("--count", type=int, default=64, help="number of glyphs (default 64)")
+    p = sub.add_parser("sprite", help="convert sprite image or editor bytearrays")
+    p.add_argument("source")
+    p.add_argument("out")
+    p.add_argument("--frames", type=int, default=1, help="number of frames (default 1)")
+    p.add_argument("--packed", action="store_true", help="write 32-bit column words")
+    p.add_argument("--size", type=size, help="frame size WxH (for bytearray sources)")
+    p = sub.add_parser("variants", help="render rotated and scaled sprite variants")
+    p.add_argument("source")
+    p.add_argument("out")
+    p.add_argument("--angles", type=int, default=16, help="number of angles (default 16)")
+    p.add_argument("--scales", type=lambda s: [float(v) for v in s.split(",")], default=[1.0],
+                   help="comma-separated scale factors (default 1.0)")
+    p.add_argument("--size", type=size, help="frame size WxH (for bytearray sources)")
+    p = sub.add_parser("dump", help="show contents of asset file")
+    p.add_argument("file")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "font":
+        make_font(args.image, args.out, args.cell, args.count)
+    elif args.cmd == "sprite":
+        make_sprite(args.source, args.out, args.frames, args.packed, args.size)
+    elif args.cmd == "variants":
+        make_variants(args.source, args.out, args.angles, args.scales, args.size)
+    else:
+        dump(args.file)
+
+if __name__ == "__main__":
+    main()
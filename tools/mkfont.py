@@ -0,0 +1,131 @@
+# MKFONT compiles bitmap fonts for textmode into font asset files (.tba, see lib/assets.py).
+# It runs on the host and only needs the Python standard library.
+#
+# python3 tools/mkfont.py SOURCE OUT [--cell WxH] [--outline auto|image|dilate|cross] [--count 64]
+#  - SOURCE is either a PNG image with glyphs arranged in a grid of cells (left to right, top
+#    to bottom, e.g. assets/font7x8.png) or a text file with one glyph after the other (e.g.
+#    assets/font3x5.txt)
+#  - --cell: character cell size in px (default 7x8); the cell height must not exceed 8 px
+#  - --count: number of glyphs (default 64, i.e. the textmode character set ASCII 32 .. 95)
+#  - --outline: how the background plane (the outline used by the overlay and outline modes)
+#    is obtained
+#      + image: use the grey pixels of the PNG image (hand-drawn outline)
+#      + dilate: derive outline by growing each glyph by one pixel in all eight directions
+#      + cross: derive outline by growing each glyph by one pixel horizontally and vertically
+#      + auto (default): image if the source contains grey pixels, dilate otherwise; a
+#        hand-drawn outline deliberately takes precedence, so font7x8.png keeps its tuned
+#        outline (pass --outline dilate to use the derived one instead)
+#    Derived outlines are clipped to the character cell.
+#
+# Text sources contain a block for each glyph: a line "= C" naming the character C (or
+# "= space"), followed by one line per pixel row with "#" for set and "." for clear pixels.
+# All glyphs must have the same size, which may be smaller than the cell: glyphs are then
+# placed one pixel from the left and top of the cell (e.g. a 3x5 glyph in a 4x5 cell has
+# one blank column on the left that separates characters). Lines starting with ";" are
+# comments and blank lines are ignored.
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import mkasset
+import pngread
+
+def read_image(path, cell, count):
+    cw, ch = cell
+    width, height, rows = pngread.read(path)
+    grid = pngread.classify(rows)
+    cols = width // cw
+    if count > cols * (height // ch):
+        raise Exception(f"{path} contains fewer than {count} glyphs of size {cw}x{ch}")
+    glyphs = []
+    for i in range(count):
+        x0 = (i % cols) * cw
+        y0 = (i // cols) * ch
+        glyphs.append([grid[y0 + y][x0:x0 + cw] for y in range(ch)])
+    return glyphs
+
+def read_text(path, cell, count):
+    cw, ch = cell
+    blocks = []
+    with open(path) as fh:
+        for n, line in enumerate(fh, 1):
+            line = line.rstrip("\n")
+            if not line.strip() or line.startswith(";"):
+                continue
+            if line.startswith("="):
+                name = line[1:].strip()
+                blocks.append((n, " " if name == "space" else name, []))
+            elif not blocks:
+                raise Exception(f"{path}:{n}: pixel row before first glyph name")
+            else:
+                blocks[-1][2].append(line.strip())
+    if len(blocks) < count:
+        raise Exception(f"{path} contains fewer than {count} glyphs")
+    gw = len(blocks[0][2][0]) if blocks[0][2] else 0
+    gh = len(blocks[0][2])
+    if gw > cw or gh > ch:
+        raise Exception(f"{path}: glyphs of size {gw}x{gh} do not fit into {cw}x{ch} cells")
+    dx = 1 if gw < cw else 0
+    dy = 1 if gh < ch else 0
+    glyphs = []
+    for i, (n, name, rows) in enumerate(blocks[:count]):
+        if len(name) != 1 or ord(name) != 32 + i:
+            raise Exception(f"{path}:{n}: expected glyph for {chr(32 + i)!r}, found {name!r}")
+        if len(rows) != gh or any(len(r) != gw or r.strip("#.") for r in rows):
+            raise Exception(f"{path}:{n}: glyph must be {gw}x{gh} pixels of '#' and '.'")
+        g = [[0] * cw for _ in range(ch)]
+        for y, r in enumerate(rows):
+            for x, c in enumerate(r):
+                g[dy + y][dx + x] = 2 if c == "#" else 0
+        glyphs.append(g)
+    return glyphs
+
+def derive_outline(glyph, diagonal):
+    # mark cell pixels next to a glyph pixel as outline (1), keeping glyph pixels (2)
+    ch = len(glyph)
+    cw = len(glyph[0])
+    out = [[2 if v == 2 else 0 for v in row] for row in glyph]
+    for y in range(ch):
+        for x in range(cw):
+            if glyph[y][x] != 2:
+                continue
+            for dy in (-1, 0, 1):
+                for dx in (-1, 0, 1):
+                    if dx and dy and not diagonal:
+                        continue
+                    if 0 <= y + dy < ch and 0 <= x + dx < cw and out[y + dy][x + dx] == 0:
+                        out[y + dy][x + dx] = 1
+    return out
+
+def compile_font(source, out, cell, count, outline):
+    if not 0 < cell[1] <= 8:
+        raise Exception("cell height must be 1 .. 8 px")
+    if source.lower().endswith(".png"):
+        glyphs = read_image(source, cell, count)
+    else:
+        glyphs = read_text(source, cell, count)
+    if outline == "auto":
+        has_grey = any(v == 1 for g in glyphs for row in g for v in row)
+        outline = "image" if has_grey else "dilate"
+    if outline != "image":
+        glyphs = [derive_outline(g, outline == "dilate") for g in glyphs]
+    planes = [mkasset.pack_planes(g, 0, 0, cell[0], cell[1]) for g in glyphs]
+    mkasset.write(out, "F", cell[0], cell[1], planes)
+    return outline
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="compile bitmap font into textmode font asset")
+    ap.add_argument("source", help="PNG image or text file with glyphs")
+    ap.add_argument("out")
+    ap.add_argument("--cell", type=mkasset.size, default=(7, 8), help="character cell size WxH (default 7x8)")
+    ap.add_argument("--count", type=int, default=64, help="number of glyphs (default 64)")
+    ap.add_argument("--outline", choices=["auto", "image", "dilate", "cross"], default="auto",
+                    help="source of outline (background) plane (default auto: image outline if present)")
+    args = ap.parse_args(argv)
+    used = compile_font(args.source, args.out, args.cell, args.count, args.outline)
+    print(f"{args.out}: {args.count} glyphs, {args.cell[0]}x{args.cell[1]} cells, outline {used}")
+
+if __name__ == "__main__":
+    main()
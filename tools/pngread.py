@@ -0,0 +1,77 @@
+# PNGREAD is a minimal PNG decoder (standard library only) for the asset tools.
+# It supports non-interlaced 8-bit greyscale, greyscale + alpha, RGB and RGBA images,
+# which covers the images exported by the usual editors.
+#
+# width, height, rows = pngread.read(path)
+#  - rows[y][x] is a tuple of channel values (e.g. (r, g, b) for RGB images)
+#
+# grid = pngread.classify(rows)
+#  - map each pixel to 0 (black = transparent), 1 (grey = mask only) or 2 (white = bitmap)
+#  - this is the colour convention of the asset images (e.g. assets/balloon.png)
+
+import struct
+import zlib
+
+CHANNELS = {0: 1, 2: 3, 4: 2, 6: 4}
+
+def read(path):
+    with open(path, "rb") as fh:
+        data = fh.read()
+    if data[:8] != b"\x89PNG\r\n\x1a\n":
+        raise Exception(f"{path} is not a PNG file")
+    pos = 8
+    idat = b""
+    header = None
+    while pos < len(data):
+        n, tag = struct.unpack(">I4s", data[pos:pos + 8])
+        body = data[pos + 8:pos + 8 + n]
+        pos += n + 12
+        if tag == b"IHDR":
+            header = struct.unpack(">IIBBBBB", body)
+        elif tag == b"IDAT":
+            idat += body
+        elif tag == b"IEND":
+            break
+    width, height, depth, color_type, _, _, interlace = header
+    if depth != 8 or color_type not in CHANNELS or interlace:
+        raise Exception(f"{path}: only non-interlaced 8-bit grey/RGB(A) images are supported")
+    bpp = CHANNELS[color_type]
+    raw = zlib.decompress(idat)
+    stride = width * bpp
+    prev = bytearray(stride)
+    rows = []
+    p = 0
+    for y in range(height):
+        ftype = raw[p]
+        line = bytearray(raw[p + 1:p + 1 + stride])
+        p += stride + 1
+        for i in range(stride):
+            a = line[i - bpp] if i >= bpp else 0
+            b = prev[i]
+            c = prev[i - bpp] if i >= bpp else 0
+            if ftype == 1:
+                line[i] = (line[i] + a) & 0xff
+            elif ftype == 2:
+                line[i] = (line[i] + b) & 0xff
+            elif ftype == 3:
+                line[i] = (line[i] + (a + b) // 2) & 0xff
+            elif ftype == 4:
+                pa, pb, pc = abs(b - c), abs(a - c), abs(a + b - 2 * c)
+                pred = a if pa <= pb and pa <= pc else b if pb <= pc else c
+                line[i] = (line[i] + pred) & 0xff
+        rows.append([tuple(line[x * bpp:(x + 1) * bpp]) for x in range(width)])
+        prev = line
+    return width, height, rows
+
+def classify(rows):
+    grid = []
+    for row in rows:
+        out = []
+        for px in row:
+            if len(px) in (2, 4) and px[-1] < 128:
+                out.append(0) # transparent pixel
+                continue
+            level = sum(px[:3]) / len(px[:3]) if len(px) >= 3 else px[0]
+            out.append(2 if level >= 192 else 1 if level >= 32 else 0)
+        grid.append(out)
+    return grid